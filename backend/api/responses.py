@@ -0,0 +1,31 @@
+from typing import Dict, List, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from models.task import Task
+from schemas.task import TaskResponse
+
+
+class PydanticJSONResponse(Response):
+    """
+    JSON response whose body was already serialized by a pydantic TypeAdapter.
+
+    Returning it from a route skips FastAPI's generic jsonable_encoder/json.dumps pass.
+    """
+    media_type = "application/json"
+
+
+def task_columns() -> List:
+    """
+    Task columns needed for a TaskResponse, for column-only list queries
+    """
+    return [getattr(Task, name) for name in TaskResponse.model_fields]
+
+
+def json_response(adapter: TypeAdapter, value, headers: Optional[Dict[str, str]] = None) -> PydanticJSONResponse:
+    """
+    Validate ORM objects, rows or dicts with a compiled adapter and serialize them in one step
+    """
+    validated = adapter.validate_python(value, from_attributes=True)
+    return PydanticJSONResponse(content=adapter.dump_json(validated), headers=headers)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException
+from utils.ai_classifier import classification_flights
+from utils.classification_cache import classification_cache
+from utils.classification_worker import classification_worker
+from utils.retry import rate_limiter_stats
+from utils.circuit_breaker import circuit_breaker_stats, reset_circuit_breakers
+from utils.local_classifier import local_classifier
+from utils.health_prober import provider_health_prober
+from utils.provider_router import provider_router
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/classifier/cache")
+def get_cache_stats():
+    """Return hit/miss counters and sizes of the classification cache tiers"""
+    return classification_cache.stats()
+
+@router.delete("/classifier/cache")
+def clear_cache():
+    """Drop all entries from the in-process classification cache"""
+    classification_cache.clear()
+    logger.info("In-process classification cache cleared")
+    return {"message": "Classification cache cleared"}
+
+@router.get("/classifier/queue")
+def get_queue_stats():
+    """Return the state of the background classification workers in this process"""
+    return classification_worker.stats()
+
+@router.get("/classifier/coalescing")
+def get_coalescing_stats():
+    """Return how many classification calls were served by an identical in-flight call"""
+    return classification_flights.stats()
+
+@router.get("/classifier/rate-limits")
+def get_rate_limit_stats():
+    """Return the state of the per-provider rate limiters"""
+    return rate_limiter_stats()
+
+@router.get("/classifier/circuits")
+def get_circuit_states():
+    """Return the circuit breaker state of every provider and model used so far"""
+    return circuit_breaker_stats()
+
+@router.post("/classifier/circuits/reset")
+def reset_circuits():
+    """Close all circuit breakers"""
+    reset_circuit_breakers()
+    logger.info("All circuit breakers reset")
+    return {"message": "Circuit breakers reset"}
+
+@router.get("/classifier/health")
+def get_provider_health():
+    """Return the cached result of every background provider health probe"""
+    return provider_health_prober.stats()
+
+@router.get("/classifier/router")
+def get_router_stats():
+    """Return observed latency and error rate of every provider backend, and how often requests were hedged"""
+    return provider_router.stats()
+
+@router.get("/classifier/local")
+def get_local_classifier_stats():
+    """Return the state of the local classifier tier and how often it answered"""
+    return local_classifier.stats()
+
+@router.post("/classifier/local/retrain")
+async def retrain_local_classifier():
+    """Retrain the local classifier from tasks already classified by the AI provider"""
+    try:
+        trained_samples = await asyncio.to_thread(local_classifier.retrain_from_db)
+    except Exception as e:
+        logger.error(f"Local classifier retraining failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Retraining failed: {str(e)}")
+
+    if not trained_samples:
+        return {
+            "status": "skipped",
+            "message": f"At least {local_classifier.min_samples} AI-classified tasks are needed to train the local classifier"
+        }
+    return {
+        "status": "success",
+        "message": f"Local classifier trained on {trained_samples} tasks",
+        "trained_samples": trained_samples
+    }
@@ -0,0 +1,59 @@
+import asyncio
+import json
+import logging
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from config import settings
+from utils.pagination import encode_change_cursor
+from utils.task_events import task_event_broker
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def format_event(event: dict) -> str:
+    """Encode a task event as a Server-Sent Events message"""
+    lines = []
+    if "task_id" in event:
+        # The id is a changes feed cursor: GET /users/{user_id}/tasks/changes?since=<id> catches up from here
+        lines.append(f"id: {encode_change_cursor(event['change_version'], event['task_id'])}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+@router.get("/users/{user_id}/events")
+async def stream_user_events(user_id: str):
+    """
+    Server-Sent Events stream of a user's task changes: created, updated,
+    classified and deleted events, plus resync when events may have been missed
+    """
+    if not settings.task_events_enabled:
+        raise HTTPException(status_code=404, detail="Task events are disabled")
+
+    queue = task_event_broker.subscribe(user_id)
+
+    async def event_stream():
+        try:
+            yield f"retry: {int(settings.task_events_reconnect_delay * 1000)}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.task_events_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            task_event_broker.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/events/stats")
+def get_event_stats():
+    """Return the state of the task event listener in this process"""
+    return task_event_broker.stats()
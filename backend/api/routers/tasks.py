@@ -1,12 +1,31 @@
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
-from models.database import get_session_local
-from models.task import Task, PriorityEnum, CategoryEnum
-from schemas.task import TaskCreate, TaskUpdate, TaskResponse
-from utils.ai_classifier import classify_task_with_ai
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from models.database import get_db
+from models.task import Task, PriorityEnum, CategoryEnum, ClassificationStatusEnum, SEARCH_CONFIG
+from models.classification_job import ClassificationJob
+from models.task_tombstone import TaskTombstone
+from models.user_task_version import bump_collection_versions, get_collection_version, publish_task_events
+from schemas.task import TaskCreate, TaskUpdate, TaskResponse, SubtaskUpdate, TaskSearchResult, TaskClassificationResponse, TaskChangesResponse, BulkCreateResponse
+from schemas.task import task_response_adapter, task_list_adapter, task_search_adapter, task_classification_adapter, task_changes_adapter, bulk_create_adapter
+from schemas.task import PriorityEnum as SchemaPriorityEnum, CategoryEnum as SchemaCategoryEnum
+from api.responses import json_response, task_columns
+from utils.ai_classifier import classify_task_with_ai, classify_tasks_batch_with_ai
+from utils.http_client import get_ai_client
+from utils.classification_worker import classification_worker
+from utils.health_prober import provider_health_prober
+from utils.subtasks import normalize_subtasks
+from utils.etags import etag_headers, etag_matches, make_etag, not_modified
+from utils.pagination import SORT_OPTIONS, InvalidCursorError, decode_cursor, encode_cursor, keyset_page
+from utils.pagination import decode_change_cursor, encode_change_cursor
+from sqlalchemy import cast, column, exists, func, insert, literal, not_, or_, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.types import Text
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from config import settings
 import os
 import importlib
 
@@ -20,87 +39,21 @@ router = APIRouter()
 async def api_health(
     provider_url: str = Query(..., description="AI provider URL"),
     api_token: str = Query(..., description="API token for the provider"),
-    model_name: str = Query("qwen/qwen3-coder:free", description="Model name to test")
+    model_name: str = Query("qwen/qwen3-coder:free", description="Model name to test"),
+    force: bool = Query(False, description="Probe the provider now instead of returning the cached result")
 ):
     """Check if the AI provider API token is valid with specified model"""
-    try:
-        from openai import OpenAI
-        import httpx
-
-        # Create headers for OpenRouter
-        headers = {
-            "Authorization": f"Bearer {api_token}",
-            "Content-Type": "application/json"
-        }
-
-        # Add referer header for OpenRouter free tier access
-        if "openrouter.ai" in provider_url:
-            headers["HTTP-Referer"] = "http://localhost:8000"  # Local development
-            headers["X-Title"] = "AI Task Helper"  # App name for OpenRouter analytics
-
-        # Create a temporary client with the provided parameters
-        http_client = httpx.Client(headers=headers)
-        temp_client = OpenAI(
-            base_url=provider_url,
-            api_key=api_token,
-            http_client=http_client
-        )
-
-        # Test the API with a simple request using the specified model
-        response = temp_client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": "Hello, are you there?"}],
-            max_tokens=5
-        )
-        return {
-            "status": "healthy",
-            "api_access": True,
-            "message": f"AI provider API is accessible and token is valid with model {model_name}",
-            "model": model_name
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "api_access": False,
-            "message": f"AI provider API error: {str(e)}",
-            "model": model_name
-        }
-
-def get_db():
-    db = get_session_local()()
-    try:
-        yield db
-    finally:
-        db.close()
+    return await provider_health_prober.check(provider_url, api_token, model_name, force=force)
 
 @router.post("/api/update-token")
 async def update_token(token: str):
     """Update the OpenRouter API token"""
     try:
-        # Update the client with the new token
-        from openai import OpenAI
-        import httpx
-
-        # Create headers for OpenRouter
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-
-        # Add referer header for OpenRouter free tier access
-        headers["HTTP-Referer"] = "http://localhost:8000"  # Local development
-        headers["X-Title"] = "AI Task Helper"  # App name for OpenRouter analytics
-
-        # Create a temporary client with the provided parameters
-        http_client = httpx.Client(headers=headers)
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=token,
-            http_client=http_client
-        )
+        # Use the pooled async client for the new token
+        client = get_ai_client("https://openrouter.ai/api/v1", token)
 
         # Test the new token
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="qwen/qwen3-coder:free",
             messages=[{"role": "user", "content": "Hello, are you there?"}],
             max_tokens=5
@@ -119,17 +72,21 @@ async def update_token(token: str):
             "message": f"Failed to validate new token: {str(e)}"
         }
 
-@router.post("/tasks/")
+@router.post("/tasks/", response_model=TaskResponse)
 async def create_task(
     task: TaskCreate,
     provider_url: str = Query(..., description="AI provider URL"),
     api_token: str = Query(..., description="API token for the provider"),
     model_name: str = Query(..., description="Model name to use for classification"),
-    db: Session = Depends(get_db)
+    background: bool = Query(False, description="Return immediately and classify the task in the background"),
+    db: AsyncSession = Depends(get_db)
 ):
     logger.info(f"Received request to create task: '{task.title}' for user '{task.user_id}'")
     logger.info(f"Using AI provider: {provider_url}, model: {model_name}")
 
+    if background:
+        return await create_task_with_background_classification(task, provider_url, api_token, model_name, db)
+
     # Use AI to classify the task with the provided parameters
     classification_result = await classify_task_with_ai(
         task.title,
@@ -151,121 +108,378 @@ async def create_task(
         priority=PriorityEnum(classification_result["priority"]),
         category=CategoryEnum(classification_result["category"]),
         estimated_time_minutes=classification_result["estimated_time_minutes"],
-        subtasks=str(classification_result["subtasks"]) if classification_result["subtasks"] else None,
-        user_id=task.user_id
+        subtasks=normalize_subtasks(classification_result["subtasks"]),
+        user_id=task.user_id,
+        ai_processed=not classification_result.get("used_fallback", False),
+        classification_status=ClassificationStatusEnum.COMPLETED.value,
+        classification_tier=classification_result.get("tier"),
+        classification_confidence=classification_result.get("confidence")
     )
 
     try:
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
-
-        # Create a custom response that includes AI status information
-        response_data = {
-            "id": db_task.id,
-            "title": db_task.title,
-            "description": db_task.description,
-            "priority": db_task.priority.value,
-            "category": db_task.category.value,
-            "estimated_time_minutes": db_task.estimated_time_minutes,
-            "subtasks": db_task.subtasks,
-            "user_id": db_task.user_id,
-            "created_at": db_task.created_at,
-            "updated_at": db_task.updated_at,
-            "ai_processed": not classification_result.get("used_fallback", False)
-        }
-        return response_data
+        await db.commit()
+        await db.refresh(db_task)
+
+        return json_response(task_response_adapter, db_task)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Error creating task")
 
-@router.get("/tasks/{task_id}")
-def read_task(task_id: int, db: Session = Depends(get_db)):
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+async def create_task_with_background_classification(task: TaskCreate, provider_url: str, api_token: str, model_name: str, db: AsyncSession):
+    """Insert the task with placeholder values and queue it for background classification"""
+    db_task = Task(
+        title=task.title,
+        description=task.description,
+        priority=PriorityEnum.MEDIUM,
+        category=CategoryEnum.OTHER,
+        estimated_time_minutes=None,
+        subtasks=None,
+        user_id=task.user_id,
+        ai_processed=False,
+        classification_status=ClassificationStatusEnum.PENDING.value
+    )
 
-    # For existing tasks, we don't know if AI was used, so we'll default to false
-    response_data = {
-        "id": task.id,
-        "title": task.title,
-        "description": task.description,
-        "priority": task.priority.value,
-        "category": task.category.value,
-        "estimated_time_minutes": task.estimated_time_minutes,
-        "subtasks": task.subtasks,
-        "user_id": task.user_id,
-        "created_at": task.created_at,
-        "updated_at": task.updated_at,
-        "ai_processed": False  # For existing tasks, we don't know the AI status
-    }
-    return response_data
+    try:
+        db.add(db_task)
+        await db.flush()
+        # The job is committed in the same transaction as the task so it can't be lost
+        db.add(ClassificationJob(
+            task_id=db_task.id,
+            provider_url=provider_url,
+            api_token=api_token,
+            model_name=model_name
+        ))
+        await db.commit()
+        await db.refresh(db_task)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Error creating task")
 
-@router.get("/users/{user_id}/tasks")
-def read_user_tasks(user_id: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    tasks = db.query(Task).filter(Task.user_id == user_id).offset(skip).limit(limit).all()
+    classification_worker.notify()
+    logger.info(f"Task ID {db_task.id} queued for background classification")
 
-    # Convert tasks to response format with ai_processed field
-    response_tasks = []
-    for task in tasks:
-        response_data = {
-            "id": task.id,
+    return json_response(task_response_adapter, db_task)
+
+@router.post("/tasks/bulk", response_model=BulkCreateResponse)
+async def create_tasks_bulk(
+    tasks: List[TaskCreate],
+    provider_url: str = Query(..., description="AI provider URL"),
+    api_token: str = Query(..., description="API token for the provider"),
+    model_name: str = Query(..., description="Model name to use for classification"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create many tasks at once, classifying them in batched AI prompts and inserting them in one transaction"""
+    logger.info(f"Received bulk request to create {len(tasks)} tasks")
+    if not tasks:
+        raise HTTPException(status_code=400, detail="No tasks provided")
+    if len(tasks) > settings.bulk_max_tasks:
+        raise HTTPException(status_code=400, detail=f"At most {settings.bulk_max_tasks} tasks can be created at once")
+
+    classification_results = await classify_tasks_batch_with_ai(
+        [(task.title, task.description or "") for task in tasks],
+        provider_url,
+        api_token,
+        model_name
+    )
+
+    rows = []
+    change_versions = await bump_collection_versions(db, [task.user_id for task in tasks])
+    for task, classification_result in zip(tasks, classification_results):
+        rows.append({
             "title": task.title,
             "description": task.description,
-            "priority": task.priority.value,
-            "category": task.category.value,
-            "estimated_time_minutes": task.estimated_time_minutes,
-            "subtasks": task.subtasks,
+            "priority": PriorityEnum(classification_result["priority"]),
+            "category": CategoryEnum(classification_result["category"]),
+            "estimated_time_minutes": classification_result["estimated_time_minutes"],
+            "subtasks": normalize_subtasks(classification_result["subtasks"]),
             "user_id": task.user_id,
-            "created_at": task.created_at,
-            "updated_at": task.updated_at,
-            "ai_processed": False  # For existing tasks, we don't know the AI status
-        }
-        response_tasks.append(response_data)
+            "ai_processed": not classification_result.get("used_fallback", False),
+            "classification_status": ClassificationStatusEnum.COMPLETED.value,
+            "classification_tier": classification_result.get("tier"),
+            "classification_confidence": classification_result.get("confidence"),
+            "change_version": change_versions[task.user_id]
+        })
 
-    return response_tasks
+    try:
+        # Single multi-row INSERT ... RETURNING, committed as one transaction
+        db_tasks = (await db.scalars(insert(Task).returning(Task, sort_by_parameter_order=True), rows)).all()
+        await publish_task_events(db, [("created", db_task.id, db_task.user_id) for db_task in db_tasks], change_versions)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Error creating tasks")
+
+    ai_processed_count = sum(1 for db_task in db_tasks if db_task.ai_processed)
+    logger.info(f"Bulk created {len(db_tasks)} tasks, {ai_processed_count} classified by AI")
+    return json_response(bulk_create_adapter, {
+        "created": len(db_tasks),
+        "ai_processed": ai_processed_count,
+        "fallback": len(db_tasks) - ai_processed_count,
+        "results": [
+            {"index": index, "status": "created", "task": db_task}
+            for index, db_task in enumerate(db_tasks)
+        ]
+    })
+
+def task_etag(task: Task) -> str:
+    return make_etag("task", task.id, task.version)
+
+@router.get("/tasks/{task_id}/classification", response_model=TaskClassificationResponse)
+async def read_task_classification(
+    task_id: int,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for a pending classification to finish"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Return the classification state of a task, optionally long-polling until it is done"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        task = await db.scalar(select(Task).where(Task.id == task_id).execution_options(populate_existing=True))
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+
+        pending_states = (ClassificationStatusEnum.PENDING.value, ClassificationStatusEnum.PROCESSING.value)
+        remaining = deadline - loop.time()
+        if task.classification_status not in pending_states or remaining <= 0:
+            break
+
+        # Woken early when a worker in this process finishes the task, otherwise re-check periodically
+        await classification_worker.wait_for_task(task_id, min(remaining, classification_worker.poll_interval))
+        # End the read transaction so the next check sees the worker's commit
+        await db.rollback()
+
+    return json_response(task_classification_adapter, task)
+
+@router.get("/tasks/{task_id}", response_model=TaskResponse)
+async def read_task(
+    task_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    task = await db.scalar(select(Task).where(Task.id == task_id))
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
 
-@router.put("/tasks/{task_id}")
-def update_task(task_id: int, task_update: TaskUpdate, db: Session = Depends(get_db)):
+    etag = task_etag(task)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return json_response(task_response_adapter, task, headers=etag_headers(etag))
+
+@router.get("/users/{user_id}/tasks", response_model=List[TaskResponse])
+async def read_user_tasks(
+    request: Request,
+    user_id: str,
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    priority: Optional[List[SchemaPriorityEnum]] = Query(None, description="Only tasks with these priorities"),
+    category: Optional[List[SchemaCategoryEnum]] = Query(None, description="Only tasks in these categories"),
+    min_estimated_minutes: Optional[int] = Query(None, ge=0),
+    max_estimated_minutes: Optional[int] = Query(None, ge=0),
+    has_open_subtasks: Optional[bool] = Query(None, description="Only tasks with (true) or without (false) open subtasks"),
+    subtask: Optional[str] = Query(None, description="Only tasks with a subtask whose title contains this text"),
+    sort: str = Query("newest", description="Sort order: " + ", ".join(SORT_OPTIONS)),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    if sort not in SORT_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort order, use one of: {', '.join(SORT_OPTIONS)}")
+    try:
+        cursor_values = decode_cursor(sort, cursor) if cursor else None
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The collection version changes with every write to the user's tasks, so an
+    # unchanged list is answered with a primary key lookup instead of a scan
+    collection_version = await get_collection_version(db, user_id)
+    etag = make_etag("tasks", user_id, collection_version, sorted(request.query_params.multi_items()))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # Column-only query: rows go straight to the serializer without ORM object hydration
+    query = select(*task_columns()).where(Task.user_id == user_id)
+    if priority:
+        query = query.where(Task.priority.in_([PriorityEnum(value.value) for value in priority]))
+    if category:
+        query = query.where(Task.category.in_([CategoryEnum(value.value) for value in category]))
+    if min_estimated_minutes is not None:
+        query = query.where(Task.estimated_time_minutes >= min_estimated_minutes)
+    if max_estimated_minutes is not None:
+        query = query.where(Task.estimated_time_minutes <= max_estimated_minutes)
+    if has_open_subtasks is not None:
+        # JSONB containment, served by the GIN index on subtasks
+        has_open = Task.subtasks.contains([{"done": False}])
+        query = query.where(has_open if has_open_subtasks else or_(Task.subtasks.is_(None), not_(has_open)))
+    if subtask:
+        subtask_items = func.jsonb_array_elements(Task.subtasks).table_valued(column("value", JSONB))
+        query = query.where(
+            exists().select_from(subtask_items).where(subtask_items.c.value["title"].astext.ilike(f"%{subtask}%"))
+        )
+
+    # Keyset pagination: seek past the cursor instead of OFFSET, so every page costs O(limit)
+    tasks = (await db.execute(keyset_page(query, sort, cursor_values, limit + 1))).all()
+
+    headers = etag_headers(etag)
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(sort, tasks[-1])
+
+    return json_response(task_list_adapter, tasks, headers=headers)
+
+@router.get("/users/{user_id}/tasks/changes", response_model=TaskChangesResponse)
+async def read_user_task_changes(
+    user_id: str,
+    since: Optional[str] = Query(None, description="next_cursor of the previous response; omit to start a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Tasks created, updated or deleted since the cursor, in the order they were written"""
+    try:
+        since_version, since_task_id = decode_change_cursor(since) if since else (-1, 0)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Change versions of one user are assigned in commit order (see models/user_task_version.py),
+    # so seeking past the cursor on (user_id, change_version, id) indexes costs O(changes)
+    after_cursor = (since_version, since_task_id)
+    feed = union_all(
+        select(Task.change_version, Task.id, literal(False).label("deleted"))
+        .where(Task.user_id == user_id, tuple_(Task.change_version, Task.id) > after_cursor),
+        select(TaskTombstone.change_version, TaskTombstone.task_id, literal(True))
+        .where(TaskTombstone.user_id == user_id, tuple_(TaskTombstone.change_version, TaskTombstone.task_id) > after_cursor)
+    ).subquery()
+    changes = (await db.execute(
+        select(feed).order_by(feed.c.change_version, feed.c.id).limit(limit + 1)
+    )).all()
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    changed_ids = [change.id for change in changes if not change.deleted]
+    tasks = []
+    if changed_ids:
+        tasks = (await db.execute(
+            select(*task_columns()).where(Task.id.in_(changed_ids)).order_by(Task.change_version, Task.id)
+        )).all()
+
+    next_cursor = encode_change_cursor(changes[-1].change_version, changes[-1].id) if changes else encode_change_cursor(since_version, since_task_id)
+    return json_response(task_changes_adapter, {
+        "tasks": tasks,
+        "deleted": [change.id for change in changes if change.deleted],
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    })
+
+@router.get("/users/{user_id}/tasks/search", response_model=List[TaskSearchResult])
+async def search_user_tasks(
+    user_id: str,
+    q: str = Query(..., min_length=1, description="Search query (web search syntax: words, \"phrases\", OR, -exclude)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Full-text search over a user's task titles, descriptions and subtasks, best matches first"""
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(Task.search_vector, query).label("rank")
+
+    # Rank and limit first using the GIN index, then build snippets only for the returned page
+    matches = (
+        select(Task.id, rank)
+        .where(Task.user_id == user_id, Task.search_vector.op("@@")(query))
+        .order_by(rank.desc(), Task.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    document = func.concat_ws(" ", Task.title, Task.description)
+    headline = func.ts_headline(
+        SEARCH_CONFIG, document, query, "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5"
+    ).label("headline")
+    rows = (await db.execute(
+        select(*task_columns(), matches.c.rank, headline)
+        .join(matches, matches.c.id == Task.id)
+        .order_by(matches.c.rank.desc(), Task.id.desc())
+    )).all()
+
+    return json_response(task_search_adapter, rows)
+
+@router.put("/tasks/{task_id}", response_model=TaskResponse)
+async def update_task(
+    task_id: int,
+    task_update: TaskUpdate,
+    if_match: Optional[str] = Header(None, description="ETag of the version being updated; the update fails with 412 if the task changed"),
+    db: AsyncSession = Depends(get_db)
+):
     logger.info(f"Received request to update task ID: {task_id}")
 
-    db_task = db.query(Task).filter(Task.id == task_id).first()
+    db_task = await db.scalar(select(Task).where(Task.id == task_id))
     if not db_task:
         logger.warning(f"Task with ID {task_id} not found for update")
         raise HTTPException(status_code=404, detail="Task not found")
+    if if_match and not etag_matches(if_match, task_etag(db_task)):
+        raise HTTPException(status_code=412, detail="Task was modified since it was read")
 
     # Update task fields if provided
     update_data = task_update.dict(exclude_unset=True)
+    if "subtasks" in update_data:
+        update_data["subtasks"] = normalize_subtasks(update_data["subtasks"])
     for field, value in update_data.items():
         setattr(db_task, field, value)
 
-    db.commit()
-    db.refresh(db_task)
+    try:
+        await db.commit()
+    except StaleDataError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Task was modified concurrently, please retry")
+    await db.refresh(db_task)
 
     logger.info(f"Task ID {task_id} updated successfully")
 
-    # Return updated task with ai_processed field
-    response_data = {
-        "id": db_task.id,
-        "title": db_task.title,
-        "description": db_task.description,
-        "priority": db_task.priority.value,
-        "category": db_task.category.value,
-        "estimated_time_minutes": db_task.estimated_time_minutes,
-        "subtasks": db_task.subtasks,
-        "user_id": db_task.user_id,
-        "created_at": db_task.created_at,
-        "updated_at": db_task.updated_at,
-        "ai_processed": False  # For updated tasks, we don't know the AI status
+    return json_response(task_response_adapter, db_task, headers=etag_headers(task_etag(db_task)))
+
+@router.patch("/tasks/{task_id}/subtasks/{subtask_index}")
+async def update_subtask(task_id: int, subtask_index: int, subtask_update: SubtaskUpdate, db: AsyncSession = Depends(get_db)):
+    """Mark one subtask of a task as done or open"""
+    user_id = await db.scalar(select(Task.user_id).where(Task.id == task_id))
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    change_versions = await bump_collection_versions(db, [user_id])
+
+    # Updated in place with jsonb_set so concurrent toggles of different subtasks don't overwrite each other
+    updated = (await db.execute(
+        update(Task)
+        .where(Task.id == task_id, subtask_index >= 0, func.jsonb_array_length(func.coalesce(Task.subtasks, cast([], JSONB))) > subtask_index)
+        .values(
+            subtasks=func.jsonb_set(
+                Task.subtasks,
+                cast([str(subtask_index), "done"], ARRAY(Text)),
+                cast(subtask_update.done, JSONB)
+            ),
+            # Core UPDATEs don't maintain version_id_col or change_version
+            version=Task.version + 1,
+            change_version=change_versions[user_id]
+        )
+        .returning(Task.subtasks)
+    )).first()
+    if updated is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Subtask not found")
+    subtasks = updated.subtasks
+    await publish_task_events(db, [("updated", task_id, user_id)], change_versions)
+    await db.commit()
+
+    logger.info(f"Subtask {subtask_index} of task ID {task_id} marked as {'done' if subtask_update.done else 'open'}")
+    return {
+        "id": task_id,
+        "subtasks": subtasks,
+        "open_subtasks": sum(1 for item in subtasks if not item["done"])
     }
-    return response_data
 
 @router.delete("/tasks/{task_id}")
-def delete_task(task_id: int, db: Session = Depends(get_db)):
-    task = db.query(Task).filter(Task.id == task_id).first()
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
+    task = await db.scalar(select(Task).where(Task.id == task_id))
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    db.delete(task)
-    db.commit()
+    await db.delete(task)
+    await db.commit()
     return {"message": "Task deleted successfully"}
\ No newline at end of file
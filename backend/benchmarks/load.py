@@ -0,0 +1,339 @@
+"""
+Load test for the task endpoints of a running backend, with the AI provider
+replaced by the local mock provider (benchmarks/mock_provider.py).
+
+Usage (from the backend directory, with the backend running):
+    python -m benchmarks.load --scenario create --requests 200 --concurrency 20
+        [--backend http://localhost:8001] [--provider-url http://host:9100/v1]
+        [--mock-latency 0.5 --mock-error-rate 0.05 --mock-rate-limit 20 ...]
+        [--duplicate-ratio 0.2] [--output results.json] [--baseline baseline.json]
+
+Without --provider-url a mock provider is started on --mock-port with the
+--mock-* behavior. The backend must be able to reach it: with the backend in
+docker, pass e.g. --mock-public-url http://host.docker.internal:9100/v1.
+
+Scenarios:
+    create             POST /tasks/ (AI classification in the request)
+    create-background  POST /tasks/?background=true
+    bulk               POST /tasks/bulk with --bulk-size tasks per request
+    list               GET /users/{user}/tasks after seeding --seed tasks
+    search             GET /users/{user}/tasks/search after seeding --seed tasks
+
+Reports p50/p95/p99 latency, requests/s, errors, classification tiers and
+provider calls per task; --output saves the report and --baseline compares
+against a saved one. Task texts avoid the local classifier's keywords so the
+AI path is measured; the report warns when the local tier answered anyway
+(e.g. a trained naive Bayes model, disable it with LOCAL_CLASSIFIER_ENABLED=False).
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.mock_provider import add_behavior_arguments
+
+SCENARIOS = ["create", "create-background", "bulk", "list", "search"]
+
+# Words none of the local classifier's keyword rules match, so tasks go to the AI provider
+WORDS = ["invoice", "budget", "draft", "backup", "migration", "chapter", "presentation", "roadmap", "interview",
+         "audit", "proposal", "spreadsheet", "itinerary", "inventory", "newsletter", "survey", "brochure", "schedule"]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class TaskFactory:
+    """Unique task texts, with a share of repeats to exercise the cache and call coalescing"""
+
+    def __init__(self, duplicate_ratio: float):
+        self.duplicate_ratio = duplicate_ratio
+        self.issued: List[Dict] = []
+
+    def make(self, user_id: str) -> Dict:
+        if self.issued and random.random() < self.duplicate_ratio:
+            return {**random.choice(self.issued), "user_id": user_id}
+        words = random.sample(WORDS, 3)
+        task = {
+            "title": f"{words[0].capitalize()} {words[1]} {uuid.uuid4().hex[:8]}",
+            "description": f"Benchmark task about the {words[2]} ({uuid.uuid4().hex[:12]})",
+            "user_id": user_id
+        }
+        self.issued.append(task)
+        return task
+
+
+class LoadTest:
+    def __init__(self, args, provider_url: str):
+        self.args = args
+        self.api = args.backend.rstrip("/") + "/api/v1"
+        self.provider_params = {"provider_url": provider_url, "api_token": "benchmark", "model_name": args.model}
+        self.user_id = f"benchmark-load-{uuid.uuid4().hex[:8]}"
+        self.tasks = TaskFactory(args.duplicate_ratio)
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.tiers: Counter = Counter()
+        self.created_ids: List[int] = []
+        self.tasks_sent = 0
+
+    async def request(self, client: httpx.AsyncClient):
+        scenario = self.args.scenario
+        if scenario in ("create", "create-background"):
+            params = dict(self.provider_params, background=str(scenario == "create-background").lower())
+            self.tasks_sent += 1
+            return await client.post(f"{self.api}/tasks/", params=params, json=self.tasks.make(self.user_id))
+        if scenario == "bulk":
+            batch = [self.tasks.make(self.user_id) for _ in range(self.args.bulk_size)]
+            self.tasks_sent += len(batch)
+            return await client.post(f"{self.api}/tasks/bulk", params=self.provider_params, json=batch)
+        if scenario == "list":
+            return await client.get(f"{self.api}/users/{self.user_id}/tasks", params={"limit": self.args.page_size})
+        return await client.get(
+            f"{self.api}/users/{self.user_id}/tasks/search",
+            params={"q": random.choice(WORDS), "limit": self.args.page_size}
+        )
+
+    def record(self, response: httpx.Response):
+        self.statuses[response.status_code] += 1
+        if response.status_code != 200 or self.args.scenario not in ("create", "create-background", "bulk"):
+            return
+        body = response.json()
+        items = [result.get("task") for result in body.get("results", [])] if self.args.scenario == "bulk" else [body]
+        for item in items:
+            if item:
+                self.created_ids.append(item["id"])
+                self.tiers[item.get("classification_tier") or item.get("classification_status") or "unknown"] += 1
+
+    async def worker(self, client: httpx.AsyncClient, remaining: List[int]):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                response = await self.request(client)
+            except httpx.HTTPError as e:
+                self.statuses[type(e).__name__] += 1
+                continue
+            self.latencies.append(time.perf_counter() - started)
+            self.record(response)
+
+    async def seed(self, client: httpx.AsyncClient):
+        for start in range(0, self.args.seed, 100):
+            batch = [self.tasks.make(self.user_id) for _ in range(min(100, self.args.seed - start))]
+            response = await client.post(f"{self.api}/tasks/bulk", params=self.provider_params, json=batch)
+            response.raise_for_status()
+            self.created_ids.extend(result["task"]["id"] for result in response.json()["results"] if result.get("task"))
+
+    async def cleanup(self, client: httpx.AsyncClient):
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def delete(task_id: int):
+            async with semaphore:
+                await client.delete(f"{self.api}/tasks/{task_id}")
+
+        await asyncio.gather(*(delete(task_id) for task_id in self.created_ids), return_exceptions=True)
+
+    async def run(self, mock_url: Optional[str]) -> Dict:
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=self.args.timeout, trust_env=False) as client:
+            if self.args.scenario in ("list", "search"):
+                print(f"Seeding {self.args.seed} tasks for {self.user_id}")
+                await self.seed(client)
+
+            # Unmeasured requests open connections and warm the backend's caches
+            for _ in range(self.args.warmup):
+                self.record(await self.request(client))
+            self.statuses.clear()
+            self.tiers.clear()
+            self.tasks_sent = 0
+            if mock_url:
+                await client.post(f"{mock_url}/stats/reset")
+
+            remaining = [self.args.requests]
+            started = time.perf_counter()
+            await asyncio.gather(*(self.worker(client, remaining) for _ in range(self.args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+            provider = (await client.get(f"{mock_url}/stats")).json() if mock_url else None
+            if not self.args.keep:
+                await self.cleanup(client)
+
+        return self.report(elapsed, provider)
+
+    def report(self, elapsed: float, provider: Optional[Dict]) -> Dict:
+        latencies = sorted(self.latencies)
+        completed = len(latencies)
+        report = {
+            "scenario": self.args.scenario,
+            "requests": self.args.requests,
+            "concurrency": self.args.concurrency,
+            "elapsed_seconds": round(elapsed, 3),
+            "requests_per_second": round(completed / elapsed, 2) if elapsed else 0.0,
+            "errors": sum(count for status, count in self.statuses.items() if status != 200),
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.50) * 1000, 1),
+                "p95": round(percentile(latencies, 0.95) * 1000, 1),
+                "p99": round(percentile(latencies, 0.99) * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                "mean": round(sum(latencies) / completed * 1000, 1) if completed else 0.0
+            },
+            "tiers": dict(self.tiers)
+        }
+        if provider is not None and self.tasks_sent:
+            report["provider"] = {
+                "calls": provider["calls"],
+                "calls_per_task": round(provider["calls"] / self.tasks_sent, 3),
+                "classified_tasks": provider["classified_tasks"],
+                "rate_limited": provider["rate_limited"],
+                "errors": provider["errors"],
+                "max_in_flight": provider["max_in_flight"],
+                "tokens_generated": provider["tokens_generated"],
+                "tokens_per_task": round(provider["tokens_generated"] / self.tasks_sent, 1),
+                "prompt_tokens_per_task": round(provider["prompt_tokens"] / self.tasks_sent, 1),
+                "streams_cancelled": provider["streams_cancelled"]
+            }
+        if self.tasks_sent:
+            report["tasks_per_second"] = round(self.tasks_sent / elapsed, 2)
+        return report
+
+
+def print_report(report: Dict, baseline: Optional[Dict]):
+    def change(path: List[str]) -> str:
+        if baseline is None:
+            return ""
+        before, after = baseline, report
+        for key in path:
+            before, after = (before or {}).get(key), (after or {}).get(key)
+        if not before or after is None:
+            return ""
+        return f"  ({(after - before) / before * 100:+.1f}% vs baseline {before})"
+
+    latency = report["latency_ms"]
+    print(f"\nScenario {report['scenario']}: {report['requests']} requests, concurrency {report['concurrency']}")
+    print(f"  throughput   {report['requests_per_second']} req/s{change(['requests_per_second'])}")
+    if "tasks_per_second" in report:
+        print(f"  tasks        {report['tasks_per_second']} tasks/s{change(['tasks_per_second'])}")
+    for name in ("p50", "p95", "p99", "max"):
+        print(f"  latency {name:<4} {latency[name]} ms{change(['latency_ms', name])}")
+    print(f"  errors       {report['errors']} {report['statuses']}")
+    if report["tiers"]:
+        print(f"  tiers        {report['tiers']}")
+        local = report["tiers"].get("local", 0)
+        if local:
+            print(f"  warning      {local} of {sum(report['tiers'].values())} tasks were answered by the local tier, "
+                  f"latency and provider calls per task don't only measure the AI path "
+                  f"(set LOCAL_CLASSIFIER_ENABLED=False on the backend)")
+    if "provider" in report:
+        provider = report["provider"]
+        print(f"  provider     {provider['calls']} calls, {provider['calls_per_task']} per task"
+              f"{change(['provider', 'calls_per_task'])}, {provider['rate_limited']} rate limited, "
+              f"{provider['errors']} errors, max {provider['max_in_flight']} in flight")
+        print(f"  tokens       {provider['tokens_per_task']} generated per task{change(['provider', 'tokens_per_task'])}, "
+              f"{provider['streams_cancelled']} streams cancelled early")
+        print(f"  prompt       {provider['prompt_tokens_per_task']} tokens per task{change(['provider', 'prompt_tokens_per_task'])}")
+
+
+def start_mock_provider(args) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "benchmarks.mock_provider", "--host", "0.0.0.0", "--port", str(args.mock_port),
+        "--latency", str(args.mock_latency), "--jitter", str(args.mock_jitter),
+        "--error-rate", str(args.mock_error_rate), "--invalid-rate", str(args.mock_invalid_rate),
+        "--rate-limit", str(args.mock_rate_limit), "--rate-limit-burst", str(args.mock_rate_limit_burst),
+        "--token-delay", str(args.mock_token_delay), "--chatter", str(args.mock_chatter),
+        "--sloppy-rate", str(args.mock_sloppy_rate)
+    ]
+    if not args.mock_structured_output:
+        command.append("--no-structured-output")
+    return subprocess.Popen(command)
+
+
+async def wait_until_up(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(trust_env=False) as client:
+        while True:
+            try:
+                (await client.get(url)).raise_for_status()
+                return
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} did not come up within {timeout:g}s")
+                await asyncio.sleep(0.2)
+
+
+async def run(args) -> Dict:
+    mock_process = None
+    mock_url = None
+    provider_url = args.provider_url
+    if provider_url is None:
+        mock_url = f"http://127.0.0.1:{args.mock_port}"
+        provider_url = args.mock_public_url or f"{mock_url}/v1"
+        mock_process = start_mock_provider(args)
+    elif args.provider_url.rstrip("/").endswith("/v1"):
+        # An already running mock provider still reports its call counters
+        mock_url = args.provider_url.rstrip("/")[:-3]
+
+    try:
+        if mock_process is not None:
+            await wait_until_up(f"{mock_url}/stats")
+        elif mock_url is not None:
+            try:
+                await wait_until_up(f"{mock_url}/stats", timeout=1.0)
+            except RuntimeError:
+                mock_url = None
+        return await LoadTest(args, provider_url).run(mock_url)
+    finally:
+        if mock_process is not None:
+            mock_process.terminate()
+            mock_process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the task endpoints against a mock AI provider")
+    parser.add_argument("--backend", default="http://localhost:8001", help="Backend base URL")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="create")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before the run")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--model", default="mock-model")
+    parser.add_argument("--bulk-size", type=int, default=20, help="Tasks per request in the bulk scenario")
+    parser.add_argument("--seed", type=int, default=500, help="Tasks created before the list and search scenarios")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="Share of tasks repeating an earlier task's text")
+    parser.add_argument("--keep", action="store_true", help="Keep the created tasks instead of deleting them")
+    parser.add_argument("--provider-url", help="Use this provider instead of starting the mock provider")
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--mock-public-url", help="Provider URL the backend should use to reach the started mock")
+    add_behavior_arguments(parser, prefix="mock-")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against a report saved with --output")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    report = asyncio.run(run(args))
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Local OpenAI-compatible stand-in for the AI provider, for load tests and benchmarks.
+
+Answers /v1/chat/completions with valid classification YAML (one entry per task
+for batched prompts) after a configurable delay, and can inject server errors,
+unparseable answers and 429 rate limiting. Answers are generated at
+--token-delay seconds per token, streamed when the request asks for it, and
+--chatter adds that many words of commentary after the YAML like a chatty model.
+Requests with response_format get a JSON answer (or a 400 with
+--no-structured-output), and --sloppy-rate answers use near-miss values like
+"60 minutes" or "high" that strict validation rejects.
+
+Usage (from the backend directory):
+    python -m benchmarks.mock_provider [--port 9100] [--latency 0.5] [--jitter 0.2]
+        [--error-rate 0.0] [--invalid-rate 0.0] [--rate-limit 0]
+        [--token-delay 0.0] [--chatter 0] [--sloppy-rate 0.0] [--no-structured-output]
+
+Point the backend at http://<host>:<port>/v1 as the provider URL (any token).
+GET /stats returns call counters, POST /stats/reset clears them.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from dataclasses import asdict, dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PRIORITIES = ["High", "Medium", "Low"]
+CATEGORIES = ["Work", "Personal", "Learning", "Health", "Other"]
+
+TASK_TITLE_PATTERN = re.compile(r"Task Title:")
+# Roughly one token: a word with its trailing whitespace, or a run of whitespace
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+CHATTER_WORDS = ("This", "classification", "reflects", "the", "effort", "and", "urgency", "of", "the", "task", "as",
+                 "described,", "taking", "typical", "interruptions", "into", "account.")
+
+
+@dataclass
+class MockBehavior:
+    latency: float = 0.5  # Mean seconds before answering
+    jitter: float = 0.2  # Answer delay varies uniformly by +- this many seconds
+    error_rate: float = 0.0  # Fraction of calls answered with HTTP 500
+    invalid_rate: float = 0.0  # Fraction of calls answered with content that is not classification YAML
+    rate_limit: float = 0.0  # Calls per second before answering 429, 0 disables
+    rate_limit_burst: int = 10
+    token_delay: float = 0.0  # Seconds to generate each token of the answer
+    chatter: int = 0  # Words of commentary after the YAML
+    sloppy_rate: float = 0.0  # Fraction of answers with near-miss values, e.g. "60 minutes" or "high"
+    structured_output: bool = True  # Accept response_format, otherwise answer it with 400
+
+
+@dataclass
+class MockStats:
+    calls: int = 0
+    classification_calls: int = 0
+    classified_tasks: int = 0
+    errors: int = 0
+    invalid: int = 0
+    rate_limited: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    tokens_generated: int = 0
+    prompt_tokens: int = 0
+    streams_cancelled: int = 0
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token, returning 0 or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def classification_values(sloppy: bool) -> dict:
+    priority = random.choice(PRIORITIES)
+    minutes = random.choice([15, 30, 45, 60, 90, 120])
+    return {
+        "priority": priority.lower() if sloppy else priority,
+        "category": random.choice(CATEGORIES),
+        "estimated_time_minutes": f"{minutes} minutes" if sloppy else minutes,
+        "subtasks": ["Plan the work", "Do the work"]
+    }
+
+
+def classification_yaml(task_count: int, batched: bool, sloppy: bool = False) -> str:
+    entries = []
+    for index in range(1, task_count + 1):
+        values = classification_values(sloppy)
+        fields = [
+            f"priority: {values['priority']}",
+            f"category: {values['category']}",
+            f"estimated_time_minutes: {values['estimated_time_minutes']}",
+            "subtasks:",
+            "  - Plan the work",
+            "  - Do the work"
+        ]
+        if batched:
+            entries.append("\n".join([f"- index: {index}"] + [f"  {field}" for field in fields]))
+        else:
+            entries.append("\n".join(fields))
+    return "\n".join(entries)
+
+
+def create_app(behavior: MockBehavior) -> FastAPI:
+    app = FastAPI(title="Mock AI provider")
+    stats = MockStats()
+    bucket = TokenBucket(behavior.rate_limit, behavior.rate_limit_burst) if behavior.rate_limit > 0 else None
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats.calls += 1
+
+        if bucket is not None:
+            wait = bucket.take()
+            if wait > 0:
+                stats.rate_limited += 1
+                return JSONResponse(
+                    status_code=429,
+                    content={"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                    headers={"retry-after-ms": str(int(wait * 1000) + 1)}
+                )
+
+        if body.get("response_format") and not behavior.structured_output:
+            stats.errors += 1
+            return JSONResponse(
+                status_code=400,
+                content={"error": {"message": "response_format is not supported by this model", "type": "invalid_request_error"}}
+            )
+
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        task_count = len(TASK_TITLE_PATTERN.findall(prompt))
+        prompt_tokens = len(TOKEN_PATTERN.findall(prompt))
+        stats.prompt_tokens += prompt_tokens
+        if task_count:
+            stats.classification_calls += 1
+            stats.classified_tasks += task_count
+
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        try:
+            await asyncio.sleep(max(0.0, behavior.latency + random.uniform(-behavior.jitter, behavior.jitter)))
+        finally:
+            stats.in_flight -= 1
+
+        if random.random() < behavior.error_rate:
+            stats.errors += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Injected server error", "type": "server_error"}})
+
+        if random.random() < behavior.invalid_rate:
+            stats.invalid += 1
+            content = "I'm not sure how to classify this task."
+        elif task_count and body.get("response_format"):
+            content = json.dumps(classification_values(random.random() < behavior.sloppy_rate))
+        elif task_count:
+            sloppy = random.random() < behavior.sloppy_rate
+            content = classification_yaml(task_count, batched="one entry per task" in prompt, sloppy=sloppy)
+            if behavior.chatter:
+                chatter = " ".join(CHATTER_WORDS[index % len(CHATTER_WORDS)] for index in range(behavior.chatter))
+                content = f"```yaml\n{content}\n```\n\n{chatter}"
+        else:
+            content = "Yes"
+
+        tokens = TOKEN_PATTERN.findall(content)
+        if body.get("max_tokens"):
+            tokens = tokens[:body["max_tokens"]]
+
+        if body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(
+                stream_tokens(tokens, body.get("model", "mock"), prompt_tokens if include_usage else None),
+                media_type="text/event-stream"
+            )
+
+        stats.tokens_generated += len(tokens)
+        if behavior.token_delay:
+            await asyncio.sleep(behavior.token_delay * len(tokens))
+        content = "".join(tokens)
+        return {
+            "id": f"chatcmpl-mock-{stats.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens)
+            }
+        }
+
+    async def stream_tokens(tokens, model: str, prompt_tokens=None):
+        """Stream the answer token by token, ending with a usage chunk if prompt_tokens is given"""
+        completion_id = f"chatcmpl-mock-{stats.calls}"
+
+        def event(delta: dict, finish_reason=None, usage=None) -> str:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            if usage:
+                chunk["usage"] = usage
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        sent = 0
+        try:
+            yield event({"role": "assistant", "content": ""})
+            for token in tokens:
+                if behavior.token_delay:
+                    await asyncio.sleep(behavior.token_delay)
+                yield event({"content": token})
+                sent += 1
+            yield event({}, finish_reason="stop")
+            if prompt_tokens is not None:
+                yield event({}, usage={
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": sent,
+                    "total_tokens": prompt_tokens + sent
+                })
+            yield "data: [DONE]\n\n"
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client closed the stream before the answer was complete
+            stats.streams_cancelled += 1
+            raise
+        finally:
+            stats.tokens_generated += sent
+
+    @app.get("/stats")
+    def get_stats():
+        return {**asdict(stats), "behavior": asdict(behavior)}
+
+    @app.post("/stats/reset")
+    def reset_stats():
+        in_flight = stats.in_flight
+        for name, value in asdict(MockStats()).items():
+            setattr(stats, name, value)
+        stats.in_flight = in_flight
+        return asdict(stats)
+
+    return app
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser, prefix: str = ""):
+    defaults = MockBehavior()
+    parser.add_argument(f"--{prefix}latency", type=float, default=defaults.latency, help="Mean answer delay in seconds")
+    parser.add_argument(f"--{prefix}jitter", type=float, default=defaults.jitter, help="Uniform delay variation in seconds")
+    parser.add_argument(f"--{prefix}error-rate", type=float, default=defaults.error_rate, help="Fraction of calls failing with 500")
+    parser.add_argument(f"--{prefix}invalid-rate", type=float, default=defaults.invalid_rate, help="Fraction of unparseable answers")
+    parser.add_argument(f"--{prefix}rate-limit", type=float, default=defaults.rate_limit, help="Calls per second before 429, 0 disables")
+    parser.add_argument(f"--{prefix}rate-limit-burst", type=int, default=defaults.rate_limit_burst)
+    parser.add_argument(f"--{prefix}token-delay", type=float, default=defaults.token_delay, help="Seconds per generated token")
+    parser.add_argument(f"--{prefix}chatter", type=int, default=defaults.chatter, help="Words of commentary after the YAML")
+    parser.add_argument(f"--{prefix}sloppy-rate", type=float, default=defaults.sloppy_rate,
+                        help="Fraction of answers with near-miss values like \"60 minutes\"")
+    parser.add_argument(f"--{prefix}no-structured-output", dest=f"{prefix.replace('-', '_')}structured_output",
+                        action="store_false", help="Reject response_format with 400")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock AI provider")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9100)
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+
+    behavior = MockBehavior(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        invalid_rate=args.invalid_rate,
+        rate_limit=args.rate_limit,
+        rate_limit_burst=args.rate_limit_burst,
+        token_delay=args.token_delay,
+        chatter=args.chatter,
+        sloppy_rate=args.sloppy_rate,
+        structured_output=args.structured_output
+    )
+    uvicorn.run(create_app(behavior), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
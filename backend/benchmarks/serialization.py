@@ -0,0 +1,166 @@
+"""
+Per-task serialization cost of task list responses, before and after the
+compiled TaskResponse path.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization [--tasks 10000] [--repeat 5] [--database]
+
+--database additionally seeds a temporary user in the configured database and
+compares loading the list as ORM objects against the column-only query.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from api.responses import task_columns
+from models.task import Task, PriorityEnum, CategoryEnum
+from schemas.task import TaskResponse, task_list_adapter
+
+BENCHMARK_USER = "benchmark-serialization"
+
+
+def make_tasks(count: int):
+    base = datetime(2025, 1, 1)
+    priorities = list(PriorityEnum)
+    categories = list(CategoryEnum)
+    return [
+        Task(
+            id=index + 1,
+            title=f"Benchmark task {index}",
+            description="Prepare the quarterly report and send it to the team",
+            priority=priorities[index % len(priorities)],
+            category=categories[index % len(categories)],
+            estimated_time_minutes=30 + index % 90,
+            subtasks=[{"title": "Collect numbers", "done": True}, {"title": "Write summary", "done": False}],
+            user_id=BENCHMARK_USER,
+            created_at=base + timedelta(seconds=index),
+            updated_at=base + timedelta(seconds=index),
+            ai_processed=True,
+            classification_status="completed",
+            classification_tier="llm",
+            classification_confidence=None,
+            # Transient objects don't get column defaults until they are flushed
+            version=1
+        )
+        for index in range(count)
+    ]
+
+
+def serialize_hand_built(tasks) -> bytes:
+    """The previous path: a dict per task, jsonable_encoder, then JSONResponse's json.dumps"""
+    content = [
+        {
+            "id": task.id,
+            "title": task.title,
+            "description": task.description,
+            "priority": task.priority.value,
+            "category": task.category.value,
+            "estimated_time_minutes": task.estimated_time_minutes,
+            "subtasks": task.subtasks,
+            "user_id": task.user_id,
+            "created_at": task.created_at,
+            "updated_at": task.updated_at,
+            "ai_processed": task.ai_processed,
+            "classification_status": task.classification_status,
+            "classification_tier": task.classification_tier,
+            "classification_confidence": task.classification_confidence
+        }
+        for task in tasks
+    ]
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def serialize_compiled(tasks) -> bytes:
+    """The current path: one compiled TypeAdapter validates and dumps the whole list"""
+    return task_list_adapter.dump_json(task_list_adapter.validate_python(tasks, from_attributes=True))
+
+
+def time_call(func, repeat: int) -> float:
+    """Best wall-clock time of repeat runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def report(name: str, seconds: float, count: int, baseline: float = None):
+    line = f"{name:<40} {seconds * 1000:9.1f} ms  {seconds / count * 1e6:7.2f} us/task"
+    if baseline:
+        line += f"  {baseline / seconds:5.1f}x"
+    print(line)
+
+
+def run_serialization(count: int, repeat: int):
+    tasks = make_tasks(count)
+    TaskRow = namedtuple("TaskRow", list(TaskResponse.model_fields))
+    rows = [TaskRow(*(getattr(task, name) for name in TaskRow._fields)) for task in tasks]
+
+    print(f"Serializing {count} tasks, best of {repeat} runs")
+    before = time_call(lambda: serialize_hand_built(tasks), repeat)
+    report("hand-built dicts + jsonable_encoder", before, count)
+    report("compiled adapter, ORM objects", time_call(lambda: serialize_compiled(tasks), repeat), count, before)
+    report("compiled adapter, column rows", time_call(lambda: serialize_compiled(rows), repeat), count, before)
+
+
+async def run_database(count: int, repeat: int):
+    from sqlalchemy import delete, insert, select
+    from models.database import get_async_session_local, dispose_engines
+
+    rows = [
+        {column.key: getattr(task, column.key) for column in task_columns() if column.key != "id"}
+        for task in make_tasks(count)
+    ]
+    async with get_async_session_local()() as db:
+        await db.execute(delete(Task).where(Task.user_id == BENCHMARK_USER))
+        await db.execute(insert(Task), rows)
+        await db.commit()
+
+        async def load_orm():
+            db.expunge_all()
+            return (await db.scalars(select(Task).where(Task.user_id == BENCHMARK_USER))).all()
+
+        async def load_columns():
+            return (await db.execute(select(*task_columns()).where(Task.user_id == BENCHMARK_USER))).all()
+
+        async def best_of(load):
+            best = float("inf")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                serialize_compiled(await load())
+                best = min(best, time.perf_counter() - started)
+            return best
+
+        try:
+            print(f"\nLoading and serializing {count} tasks from the database, best of {repeat} runs")
+            before = await best_of(load_orm)
+            report("ORM objects + compiled adapter", before, count)
+            report("column rows + compiled adapter", await best_of(load_columns), count, before)
+        finally:
+            await db.execute(delete(Task).where(Task.user_id == BENCHMARK_USER))
+            await db.commit()
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark task list serialization")
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", action="store_true", help="Also benchmark loading tasks from the database")
+    args = parser.parse_args()
+
+    run_serialization(args.tasks, args.repeat)
+    if args.database:
+        asyncio.run(run_database(args.tasks, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
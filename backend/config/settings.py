@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     # Database settings
@@ -17,14 +17,112 @@ class Settings(BaseSettings):
     backend_secret: str
     backend_debug: bool = False
 
+    # Database connection pool settings
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800  # Seconds before a connection is replaced
+    db_pool_timeout: float = 30.0  # Seconds to wait for a free connection
+
     # AI settings (now optional since managed via API)
     openrouter_token: Optional[str] = None
     default_model: str = "qwen/qwen3-coder:free"
 
+    # LLM HTTP client pool settings
+    llm_http2: bool = True
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 30.0
+    llm_connect_timeout: float = 10.0
+    llm_request_timeout: float = 60.0
+    llm_max_provider_clients: int = 16  # Provider URLs with a pooled client; the least recently used one is closed beyond this
+
+    # LLM response settings
+    llm_streaming: bool = False  # Stream classifications and stop reading once every field has arrived
+    llm_max_output_tokens: int = 512  # Cap on generated tokens per single-task classification, 0 for no cap
+    llm_response_format: Literal["yaml", "json_schema", "json_object"] = "yaml"  # yaml, json_schema or json_object (structured output where the provider supports it)
+
+    # LLM prompt settings
+    llm_description_token_budget: int = 300  # Longer task descriptions are shortened in prompts, 0 for no limit
+    llm_title_token_budget: int = 60
+    llm_tokenizer: str = "cl100k_base"  # tiktoken encoding for counting tokens, estimated without tiktoken
+
+    # LLM provider routing: backends tried besides the provider given with each request
+    llm_backends: str = ""  # JSON list of {"provider_url", "model_name", "api_token"} objects
+    llm_hedging_enabled: bool = False  # Send a second request to another backend when the first is slow
+    llm_hedge_percentile: float = 0.95  # Hedge once a backend is slower than this share of its recent classifications
+    llm_hedge_min_delay: float = 0.5
+    llm_hedge_initial_delay: float = 5.0  # Seconds before hedging while a backend has too few latency samples
+    llm_router_window: int = 200  # Recent classification latencies kept per backend
+    llm_router_min_samples: int = 20
+
+    # LLM retry and rate limit settings
+    llm_retry_max_attempts: int = 3
+    llm_retry_base_delay: float = 0.5  # Seconds, doubled on every attempt (with jitter)
+    llm_retry_max_delay: float = 20.0
+    llm_retry_deadline: float = 45.0  # Total time budget for one classification
+    llm_rate_limit_per_second: float = 5.0  # Requests per second per provider, 0 disables the limiter
+    llm_rate_limit_burst: int = 10
+
+    # Circuit breaker settings, per provider and model
+    circuit_breaker_failure_threshold: int = 5  # Consecutive failures before the circuit opens
+    circuit_breaker_recovery_timeout: float = 30.0  # Seconds before probe requests are allowed
+    circuit_breaker_half_open_probes: int = 1
+
+    # Prometheus metrics served at /metrics
+    metrics_enabled: bool = True
+
+    # OpenTelemetry tracing (requires requirements-tracing.txt)
+    tracing_enabled: bool = False
+    tracing_service_name: str = "ai-task-helper-backend"
+    tracing_exporter: str = "otlp"  # otlp, file (JSON lines) or console
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_file_path: str = "traces.jsonl"
+    tracing_sample_ratio: float = 1.0  # Fraction of new traces recorded; traces started upstream follow the caller
+
+    # AI provider health probes (cached results served by /api/health)
+    health_probe_enabled: bool = True
+    health_probe_interval: float = 60.0  # Seconds between background probes of each watched provider
+    health_probe_timeout: float = 10.0
+    health_probe_target_ttl: float = 3600.0  # Stop probing a provider nobody asked about for this long
+
+    # Local classifier tier settings
+    local_classifier_enabled: bool = True
+    local_classifier_threshold: float = 0.85  # Minimum measured agreement with the AI to answer without the AI provider
+    local_classifier_min_samples: int = 50  # Classified tasks needed to train the model
+    local_classifier_model_path: str = "local_classifier.json"
+
+    # Classification cache settings
+    classification_cache_enabled: bool = True
+    classification_cache_max_size: int = 10000
+    classification_cache_ttl_seconds: int = 86400
+    classification_cache_persistent: bool = False  # Also store results in Postgres
+
+    # Background classification queue settings
+    classification_workers: int = 4  # Concurrent classification jobs per process
+    classification_poll_interval: float = 2.0  # Seconds between queue polls when idle
+    classification_job_lease_seconds: int = 300  # Jobs held longer than this are reclaimed
+    classification_job_max_attempts: int = 5
+
+    # Task event stream (Server-Sent Events fed by Postgres LISTEN/NOTIFY)
+    task_events_enabled: bool = True
+    task_events_queue_size: int = 100  # Buffered events per client before it is told to resync
+    task_events_heartbeat_seconds: float = 15.0
+    task_events_reconnect_delay: float = 5.0  # Seconds before re-establishing a lost LISTEN connection
+
+    # Bulk task creation settings
+    bulk_max_tasks: int = 500
+    bulk_classification_batch_size: int = 10  # Tasks packed into one AI prompt
+    bulk_classification_concurrency: int = 4  # Concurrent AI calls per bulk request
+
     @property
     def database_url(self):
         return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
 
+    @property
+    def async_database_url(self):
+        return f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+
     class Config:
         env_file = ".env"
 
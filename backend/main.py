@@ -1,9 +1,21 @@
 import os
+import asyncio
 import logging
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from api.routers import tasks
+from api.routers import tasks, classifier, events
 from pydantic import BaseModel
+from typing import List, Optional
+from utils.http_client import close_ai_clients
+from utils.classification_worker import classification_worker
+from utils.task_events import task_event_broker
+from utils.health_prober import provider_health_prober
+from utils.provider_router import ProviderBackend, provider_router
+from utils.prompt_builder import load_tokenizer
+from utils.metrics import MetricsMiddleware, metrics_payload
+from utils.tracing import setup_tracing, shutdown_tracing
+from config import settings
+from models.database import dispose_engines
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,8 +32,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    # Outermost, so the recorded latency includes the other middleware
+    app.add_middleware(MetricsMiddleware)
+
+# Request spans continue the trace started by the frontend proxy (no-op unless TRACING_ENABLED)
+setup_tracing(app)
+
 # Include routers
 app.include_router(tasks.router, prefix="/api/v1", tags=["tasks"])
+app.include_router(classifier.router, prefix="/api/v1", tags=["classifier"])
+app.include_router(events.router, prefix="/api/v1", tags=["events"])
+
+@app.on_event("startup")
+async def startup_event():
+    # In the background: the encoding may have to be downloaded, prompts use an estimate until then
+    app.state.tokenizer_loader = asyncio.create_task(load_tokenizer(), name="load-tokenizer")
+    # Start the background classification workers
+    await classification_worker.start()
+    if settings.task_events_enabled:
+        await task_event_broker.start()
+    if settings.health_probe_enabled:
+        if current_api_token:
+            provider_health_prober.watch(current_provider_url, current_api_token, current_model)
+        for backend in provider_router.backends:
+            provider_health_prober.watch(backend.provider_url, backend.api_token, backend.model_name)
+        await provider_health_prober.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await classification_worker.stop()
+    await task_event_broker.stop()
+    await provider_health_prober.stop()
+    # Close pooled AI provider connections
+    await close_ai_clients()
+    await dispose_engines()
+    shutdown_tracing()
 
 @app.get("/")
 def read_root():
@@ -31,10 +77,16 @@ def read_root():
 class TokenUpdateRequest(BaseModel):
     token: str
 
+class BackendConfig(BaseModel):
+    provider_url: str
+    api_token: str = ""
+    model_name: str
+
 class ConfigUpdateRequest(BaseModel):
     provider_url: str
     api_token: str
     model_name: str
+    backends: Optional[List[BackendConfig]] = None  # Additional backends for the provider router, unchanged if omitted
 
 # Global variables for current provider settings
 current_provider_url = "https://openrouter.ai/api/v1"  # Default provider URL
@@ -45,6 +97,13 @@ current_model = os.getenv("DEFAULT_MODEL", "qwen/qwen3-coder:free")
 def health_check():
     return {"status": "healthy"}
 
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus scrape endpoint"""
+        payload, content_type = metrics_payload()
+        return Response(content=payload, media_type=content_type)
+
 @app.get("/api/config")
 def get_current_config():
     return {
@@ -52,14 +111,19 @@ def get_current_config():
         "model": current_model,
         "api_token": current_api_token,  # Include the token in the response
         "has_valid_token": bool(current_api_token),
+        "backends": [
+            {"provider_url": backend.provider_url, "model": backend.model_name, "has_valid_token": bool(backend.api_token)}
+            for backend in provider_router.backends
+        ],
         "status": "success"
     }
 
 @app.get("/api/health")
-def api_health_check(
+async def api_health_check(
     provider_url: str = Query(None, description="Provider URL to test"),
     api_token: str = Query(None, description="API token to test"),
-    model_name: str = Query(None, description="Model name to test")
+    model_name: str = Query(None, description="Model name to test"),
+    force: bool = Query(False, description="Probe the provider now instead of returning the cached result")
 ):
     """Check if the AI provider API token is valid with specified model"""
     # Use provided parameters or fall back to current configuration
@@ -67,48 +131,7 @@ def api_health_check(
     test_token = api_token or current_api_token
     test_model = model_name or current_model
 
-    try:
-        from openai import OpenAI
-        import httpx
-
-        # Create headers for OpenRouter
-        headers = {
-            "Authorization": f"Bearer {test_token}",
-            "Content-Type": "application/json"
-        }
-
-        # Add referer header for OpenRouter free tier access
-        if "openrouter.ai" in test_url:
-            headers["HTTP-Referer"] = "http://localhost:8000"  # Local development
-            headers["X-Title"] = "AI Task Helper"  # App name for OpenRouter analytics
-
-        # Create a temporary client with the provided parameters
-        http_client = httpx.Client(headers=headers)
-        temp_client = OpenAI(
-            base_url=test_url,
-            api_key=test_token,
-            http_client=http_client
-        )
-
-        # Test the API with a simple request using the specified model
-        response = temp_client.chat.completions.create(
-            model=test_model,
-            messages=[{"role": "user", "content": "Hello, are you there?"}],
-            max_tokens=5
-        )
-        return {
-            "status": "healthy",
-            "api_access": True,
-            "message": f"AI provider API is accessible and token is valid with model {test_model}",
-            "model": test_model
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "api_access": False,
-            "message": f"AI provider API error: {str(e)}",
-            "model": test_model
-        }
+    return await provider_health_prober.check(test_url, test_token, test_model, force=force)
 
 @app.post("/api/update-config")
 def update_current_config(request: ConfigUpdateRequest):
@@ -116,13 +139,22 @@ def update_current_config(request: ConfigUpdateRequest):
     current_provider_url = request.provider_url
     current_api_token = request.api_token
     current_model = request.model_name
+    if request.backends is not None:
+        provider_router.set_backends([
+            ProviderBackend(backend.provider_url, backend.model_name, backend.api_token) for backend in request.backends
+        ])
+    if settings.health_probe_enabled:
+        provider_health_prober.watch(current_provider_url, current_api_token, current_model)
+        for backend in provider_router.backends:
+            provider_health_prober.watch(backend.provider_url, backend.api_token, backend.model_name)
     return {
         "status": "success",
         "message": f"Configuration updated - Provider: {request.provider_url}, Model: {request.model_name}",
         "config": {
             "provider_url": request.provider_url,
             "model": request.model_name,
-            "has_valid_token": True
+            "has_valid_token": True,
+            "backends": len(provider_router.backends)
         }
     }
 
@@ -1,4 +1,8 @@
 from .database import engine, Base
 from .task import Task
+from .classification_cache import ClassificationCacheEntry
+from .classification_job import ClassificationJob
+from .task_tombstone import TaskTombstone
+from .user_task_version import UserTaskVersion
 
-__all__ = ["engine", "Base", "Task"]
\ No newline at end of file
+__all__ = ["engine", "Base", "Task", "ClassificationCacheEntry", "ClassificationJob", "TaskTombstone", "UserTaskVersion"]
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime, JSON
+from datetime import datetime
+
+from .database import Base
+
+class ClassificationCacheEntry(Base):
+    __tablename__ = "classification_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of the normalized classifier inputs
+    model_name = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    result = Column(JSON, nullable=False)  # Classification returned by the AI provider
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
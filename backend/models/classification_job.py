@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from datetime import datetime
+from enum import Enum
+
+from .database import Base
+
+class JobStatusEnum(Enum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    FAILED = "failed"
+
+class ClassificationJob(Base):
+    __tablename__ = "classification_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    provider_url = Column(String, nullable=False)
+    api_token = Column(String, nullable=False)  # Cleared when the job fails for good; completed jobs are deleted
+    model_name = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=JobStatusEnum.QUEUED.value)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Not claimed before this time
+    locked_until = Column(DateTime)  # Lease of the worker processing the job
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_classification_jobs_status_available", "status", "available_at"),
+    )
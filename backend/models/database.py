@@ -1,19 +1,37 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+from utils.metrics import instrument_engine
+from utils.tracing import trace_engine
 
 # Database connection parameters from settings
 DATABASE_URL = settings.database_url
+ASYNC_DATABASE_URL = settings.async_database_url
 
 # Initialize these later to avoid connection issues during import
 engine = None
 SessionLocal = None
+async_engine = None
+AsyncSessionLocal = None
+
+def _pool_options():
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_timeout": settings.db_pool_timeout
+    }
 
 def get_engine():
+    """Synchronous engine, used for table creation, migrations and command line tools"""
     global engine
     if engine is None:
-        engine = create_engine(DATABASE_URL)
+        engine = create_engine(DATABASE_URL, **_pool_options())
+        instrument_engine(engine, "sync")
+        trace_engine(engine, "sync")
     return engine
 
 def get_session_local():
@@ -22,4 +40,32 @@ def get_session_local():
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
     return SessionLocal
 
-Base = declarative_base()
\ No newline at end of file
+def get_async_engine():
+    """Asynchronous (asyncpg) engine used by the API and background workers"""
+    global async_engine
+    if async_engine is None:
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options())
+        instrument_engine(async_engine.sync_engine, "async")
+        trace_engine(async_engine.sync_engine, "async")
+    return async_engine
+
+def get_async_session_local():
+    global AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        # expire_on_commit=False so committed objects can still be read without another query
+        AsyncSessionLocal = async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+    return AsyncSessionLocal
+
+async def get_db():
+    """FastAPI dependency providing an async database session per request"""
+    async with get_async_session_local()() as db:
+        yield db
+
+async def dispose_engines():
+    """Close all pooled database connections"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
+
+Base = declarative_base()
@@ -0,0 +1,67 @@
+import json
+import logging
+from sqlalchemy import text
+
+from .task import SEARCH_VECTOR_EXPRESSION
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Idempotent schema changes for tables that already exist.
+# Base.metadata.create_all only creates missing tables, so new columns on
+# existing tables are added here. Statements must be safe to run on every start.
+MIGRATIONS = [
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS ai_processed BOOLEAN NOT NULL DEFAULT false",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS classification_status VARCHAR NOT NULL DEFAULT 'completed'",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS classification_tier VARCHAR",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS classification_confidence DOUBLE PRECISION",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0",
+    f"ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED",
+    # Jobs that failed for good don't keep the caller's provider token
+    "UPDATE classification_jobs SET api_token = '' WHERE status = 'failed' AND api_token <> ''",
+]
+
+def migrate_subtasks_to_jsonb(connection):
+    """
+    Convert tasks.subtasks from Python list reprs in a TEXT column to JSONB.
+    Does nothing once the column is JSONB.
+    """
+    from utils.subtasks import normalize_subtasks
+
+    data_type = connection.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = 'tasks' AND column_name = 'subtasks'"
+    )).scalar()
+    if data_type != "text":
+        return
+
+    connection.execute(text("ALTER TABLE tasks ADD COLUMN subtasks_jsonb JSONB"))
+    rows = connection.execute(text("SELECT id, subtasks FROM tasks WHERE subtasks IS NOT NULL")).all()
+    for task_id, subtasks in rows:
+        items = normalize_subtasks(subtasks)
+        connection.execute(
+            text("UPDATE tasks SET subtasks_jsonb = CAST(:subtasks AS JSONB) WHERE id = :id"),
+            {"id": task_id, "subtasks": json.dumps(items) if items else None}
+        )
+    connection.execute(text("ALTER TABLE tasks DROP COLUMN subtasks"))
+    connection.execute(text("ALTER TABLE tasks RENAME COLUMN subtasks_jsonb TO subtasks"))
+    logger.info(f"Converted subtasks of {len(rows)} tasks to JSONB")
+
+def run_migrations(engine):
+    """
+    Apply all schema migrations to the database
+    """
+    from .database import Base
+
+    with engine.begin() as connection:
+        # Runs first: the generated search_vector column depends on JSONB subtasks
+        migrate_subtasks_to_jsonb(connection)
+        for statement in MIGRATIONS:
+            connection.execute(text(statement))
+
+        # Indexes declared on models whose tables already existed
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+    logger.info(f"Applied {len(MIGRATIONS)} schema migrations")
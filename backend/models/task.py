@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Enum as SQLEnum, Boolean, Float, Index, Computed, false
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from datetime import datetime
 from enum import Enum
 
@@ -17,6 +19,22 @@ class CategoryEnum(Enum):
     HEALTH = "Health"
     OTHER = "Other"
 
+class ClassificationStatusEnum(Enum):
+    PENDING = "pending"  # Waiting in the background classification queue
+    PROCESSING = "processing"  # Claimed by a classification worker
+    COMPLETED = "completed"  # Classified (by AI or with fallback values)
+    FAILED = "failed"  # Background classification gave up
+
+# Text search configuration used for the search_vector column and search queries
+SEARCH_CONFIG = "english"
+
+# Weighted full-text document: title (A), description (B), subtask titles (C)
+SEARCH_VECTOR_EXPRESSION = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(subtasks, '[]'::jsonb)), 'C')"
+)
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -26,7 +44,28 @@ class Task(Base):
     priority = Column(SQLEnum(PriorityEnum), nullable=False)
     category = Column(SQLEnum(CategoryEnum), nullable=False)
     estimated_time_minutes = Column(Integer)  # Estimated time in minutes
-    subtasks = Column(Text)  # JSON string of subtasks
+    subtasks = Column(JSONB(none_as_null=True))  # List of {"title": str, "done": bool}
+    ai_processed = Column(Boolean, nullable=False, default=False, server_default=false())  # False when fallback values were used
+    classification_status = Column(String, nullable=False, default=ClassificationStatusEnum.COMPLETED.value, server_default=ClassificationStatusEnum.COMPLETED.value)
+    classification_tier = Column(String)  # Which tier answered: cache, local, llm or fallback
+    classification_confidence = Column(Float)  # Confidence of the local classifier tier
     user_id = Column(String, nullable=False, index=True)  # Simple user identification
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Incremented on every ORM update, used for ETags
+    change_version = Column(BigInteger, nullable=False, default=0, server_default="0")  # User's collection version of the last write
+    # Maintained by Postgres; deferred so regular task queries don't load it
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Optimistic concurrency: UPDATEs check and increment version, concurrent writes raise StaleDataError
+    __mapper_args__ = {"version_id_col": version}
+
+# Composite indexes backing keyset pagination of a user's tasks (see utils/pagination.py)
+Index("ix_tasks_user_created_id", Task.user_id, Task.created_at, Task.id)
+Index("ix_tasks_user_priority_created_id", Task.user_id, Task.priority, Task.created_at.desc(), Task.id.desc())
+Index("ix_tasks_user_category_created_id", Task.user_id, Task.category, Task.created_at, Task.id)
+# Containment queries on subtasks, e.g. tasks with open subtasks: subtasks @> '[{"done": false}]'
+Index("ix_tasks_subtasks", Task.subtasks, postgresql_using="gin", postgresql_ops={"subtasks": "jsonb_path_ops"})
+# Incremental sync: a user's tasks changed after a collection version
+Index("ix_tasks_user_change_version", Task.user_id, Task.change_version, Task.id)
+Index("ix_tasks_search_vector", Task.search_vector, postgresql_using="gin")
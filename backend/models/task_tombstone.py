@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Index
+from datetime import datetime
+
+from .database import Base
+
+class TaskTombstone(Base):
+    """
+    Record of a deleted task, so incremental sync clients learn about deletions
+    """
+    __tablename__ = "task_tombstones"
+
+    task_id = Column(Integer, primary_key=True)  # Task ids are never reused
+    user_id = Column(String, nullable=False)
+    change_version = Column(BigInteger, nullable=False)  # User's collection version of the delete
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+Index("ix_task_tombstones_user_change_version", TaskTombstone.user_id, TaskTombstone.change_version, TaskTombstone.task_id)
@@ -0,0 +1,134 @@
+import json
+from sqlalchemy import Column, String, BigInteger, DateTime, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from .database import Base
+from .task import Task, ClassificationStatusEnum
+from .task_tombstone import TaskTombstone
+
+# Postgres NOTIFY channel carrying task change events (see utils/task_events.py)
+TASK_EVENTS_CHANNEL = "task_events"
+
+# Keeps NOTIFY payloads well under Postgres' 8000 byte limit
+MAX_EVENTS_PER_NOTIFICATION = 50
+
+# Classification states that end a background classification
+FINISHED_CLASSIFICATION_STATES = (ClassificationStatusEnum.COMPLETED.value, ClassificationStatusEnum.FAILED.value)
+
+class UserTaskVersion(Base):
+    """
+    Version of a user's task collection, bumped in the same transaction as
+    every insert, update or delete of one of the user's tasks.
+    """
+    __tablename__ = "user_task_versions"
+
+    user_id = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def bump_statement(user_ids: Iterable[str]):
+    """
+    Upsert statement incrementing the collection version of the given users, returning the new versions
+    """
+    stmt = insert(UserTaskVersion).values([
+        {"user_id": user_id, "version": 1, "updated_at": datetime.utcnow()}
+        for user_id in sorted(set(user_ids))  # Sorted so concurrent bumps lock rows in the same order
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[UserTaskVersion.user_id],
+        set_={"version": UserTaskVersion.version + 1, "updated_at": stmt.excluded.updated_at}
+    ).returning(UserTaskVersion.user_id, UserTaskVersion.version)
+
+async def bump_collection_versions(db, user_ids: Iterable[str]) -> Dict[str, int]:
+    """
+    Bump collection versions before writing tasks with Core statements, which the
+    flush hook below doesn't see. Runs in the caller's transaction and returns the
+    new version per user, to be stored as the tasks' change_version.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    return dict((await db.execute(bump_statement(user_ids))).all())
+
+def task_event_notifications(events: Iterable[Tuple[str, int, str]], versions: Dict[str, int]) -> list:
+    """
+    pg_notify statements for (event_type, task_id, user_id) events, one or more per user.
+    Postgres delivers them to listeners only when the transaction commits.
+    """
+    events_by_user: Dict[str, List[Dict]] = {}
+    for event_type, task_id, user_id in sorted(events, key=lambda item: item[1]):
+        events_by_user.setdefault(user_id, []).append({"type": event_type, "task_id": task_id})
+
+    statements = []
+    for user_id, user_events in events_by_user.items():
+        for start in range(0, len(user_events), MAX_EVENTS_PER_NOTIFICATION):
+            payload = json.dumps({
+                "user_id": user_id,
+                "change_version": versions[user_id],
+                "events": user_events[start:start + MAX_EVENTS_PER_NOTIFICATION]
+            }, separators=(",", ":"))
+            statements.append(select(func.pg_notify(TASK_EVENTS_CHANNEL, payload)))
+    return statements
+
+async def publish_task_events(db, events: Iterable[Tuple[str, int, str]], versions: Dict[str, int]):
+    """
+    Publish events for tasks written with Core statements, in the caller's transaction
+    """
+    for statement in task_event_notifications(events, versions):
+        await db.execute(statement)
+
+async def get_collection_version(db, user_id: str) -> int:
+    version = await db.scalar(select(UserTaskVersion.version).where(UserTaskVersion.user_id == user_id))
+    return version or 0
+
+@event.listens_for(Session, "before_flush")
+def _record_task_changes(session, flush_context, instances):
+    """
+    Bump the collection version of every user whose tasks this flush adds, changes
+    or deletes, stamp changed tasks with it and leave tombstones for deleted ones.
+
+    The bump locks the user's version row until commit, so change versions of one
+    user are assigned in commit order and incremental sync can't skip a change.
+    """
+    changed = [task for task in session.new if isinstance(task, Task)]
+    changed += [
+        task for task in session.dirty
+        if isinstance(task, Task) and session.is_modified(task, include_collections=False)
+    ]
+    deleted = [task for task in session.deleted if isinstance(task, Task)]
+
+    user_ids = {task.user_id for task in changed + deleted}
+    if not user_ids:
+        return
+
+    versions = dict(session.connection().execute(bump_statement(user_ids)).all())
+    for task in changed:
+        task.change_version = versions[task.user_id]
+    for task in deleted:
+        session.add(TaskTombstone(task_id=task.id, user_id=task.user_id, change_version=versions[task.user_id]))
+    session.info["task_change_versions"] = versions
+
+@event.listens_for(Session, "after_flush")
+def _publish_task_changes(session, flush_context):
+    """
+    Publish created/updated/classified/deleted events for the tasks of this flush.
+    Runs after the flush so new tasks have ids; the session still holds the
+    pre-flush state and attribute history here.
+    """
+    versions = session.info.pop("task_change_versions", None)
+    if not versions:
+        return
+
+    events = [("created", task.id, task.user_id) for task in session.new if isinstance(task, Task)]
+    events += [("deleted", task.id, task.user_id) for task in session.deleted if isinstance(task, Task)]
+    for task in session.dirty:
+        if isinstance(task, Task) and session.is_modified(task, include_collections=False):
+            status_history = inspect(task).attrs.classification_status.history
+            classified = any(status in FINISHED_CLASSIFICATION_STATES for status in status_history.added)
+            events.append(("classified" if classified else "updated", task.id, task.user_id))
+
+    for statement in task_event_notifications(events, versions):
+        session.connection().execute(statement)
@@ -35,10 +35,12 @@ from config.settings import settings
 from models.database import get_engine
 from models.task import Task
 from models.database import Base
+from models.migrations import run_migrations
 
 # Create tables
 engine = get_engine()
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 print('Database tables created successfully!')
 "
 
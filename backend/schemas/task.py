@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, field_validator
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
@@ -15,6 +15,19 @@ class CategoryEnum(str, Enum):
     HEALTH = "Health"
     OTHER = "Other"
 
+class ClassificationStatusEnum(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class Subtask(BaseModel):
+    title: str
+    done: bool = False
+
+class SubtaskUpdate(BaseModel):
+    done: bool
+
 class TaskBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -29,17 +42,82 @@ class TaskUpdate(BaseModel):
     priority: Optional[PriorityEnum] = None
     category: Optional[CategoryEnum] = None
     estimated_time_minutes: Optional[int] = None
-    subtasks: Optional[str] = None
+    subtasks: Optional[List[Subtask]] = None
 
 class TaskResponse(TaskBase):
     id: int
     priority: PriorityEnum
     category: CategoryEnum
     estimated_time_minutes: Optional[int] = None
-    subtasks: Optional[str] = None  # JSON string of subtasks
-    created_at: datetime
-    updated_at: datetime
+    subtasks: Optional[List[Subtask]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    ai_processed: bool
+    classification_status: ClassificationStatusEnum = ClassificationStatusEnum.COMPLETED
+    classification_tier: Optional[str] = None
+    classification_confidence: Optional[float] = None
+    version: int = 1
+
+    @field_validator("priority", "category", mode="before")
+    @classmethod
+    def enum_value(cls, value):
+        # ORM rows carry the SQLAlchemy-side enums; validate them by value
+        return value.value if isinstance(value, Enum) else value
+
+    class Config:
+        from_attributes = True
+
+class TaskSearchResult(TaskResponse):
+    rank: float
+    headline: Optional[str] = None
+
+    @field_validator("rank")
+    @classmethod
+    def round_rank(cls, value):
+        # ts_rank_cd returns a float4
+        return round(value, 6)
+
+class TaskChangesResponse(BaseModel):
+    tasks: List[TaskResponse]  # Created or updated since the cursor, oldest change first
+    deleted: List[int]  # Ids of tasks deleted since the cursor
+    next_cursor: str  # Pass as since to get the following changes
+    has_more: bool  # More changes are available right away
+
+class TaskClassificationResponse(BaseModel):
+    id: int
+    classification_status: ClassificationStatusEnum
+    priority: PriorityEnum
+    category: CategoryEnum
+    estimated_time_minutes: Optional[int] = None
+    subtasks: Optional[List[Subtask]] = None
     ai_processed: bool
+    classification_tier: Optional[str] = None
+    classification_confidence: Optional[float] = None
+
+    @field_validator("priority", "category", mode="before")
+    @classmethod
+    def enum_value(cls, value):
+        # ORM rows carry the SQLAlchemy-side enums; validate them by value
+        return value.value if isinstance(value, Enum) else value
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BulkTaskResult(BaseModel):
+    index: int
+    status: str
+    task: TaskResponse
+
+class BulkCreateResponse(BaseModel):
+    created: int
+    ai_processed: int
+    fallback: int
+    results: List[BulkTaskResult]
+
+# Validators/serializers compiled once and reused for every response
+task_response_adapter = TypeAdapter(TaskResponse)
+task_list_adapter = TypeAdapter(List[TaskResponse])
+task_search_adapter = TypeAdapter(List[TaskSearchResult])
+task_classification_adapter = TypeAdapter(TaskClassificationResponse)
+task_changes_adapter = TypeAdapter(TaskChangesResponse)
+bulk_create_adapter = TypeAdapter(BulkCreateResponse)
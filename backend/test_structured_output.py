@@ -0,0 +1,25 @@
+from utils.structured_output import coerce_minutes
+
+
+def test_coerce_minutes():
+    assert coerce_minutes("60") == 60
+    assert coerce_minutes("60 minutes") == 60
+    assert coerce_minutes("1.5 hours") == 90
+    assert coerce_minutes("1h 30m") == 90
+    assert coerce_minutes("1 hour and 30 minutes") == 90
+    assert coerce_minutes("30-45 min") == 38
+    assert coerce_minutes("2 days") == "2 days"
+    assert coerce_minutes("soon") == "soon"
+
+
+def test_coerce_minutes_restated_duration():
+    # Only the first duration counts, a restatement in other units isn't added to it
+    assert coerce_minutes("90 min (1.5 h)") == 90
+    assert coerce_minutes("about 2 hours, i.e. 120 minutes") == 120
+    assert coerce_minutes("30-45 min (roughly 40 minutes)") == 38
+
+
+if __name__ == "__main__":
+    test_coerce_minutes()
+    test_coerce_minutes_restated_duration()
+    print("coerce_minutes tests passed")
@@ -1,3 +1,4 @@
-from .ai_classifier import classify_task_with_ai
+from .ai_classifier import classify_task_with_ai, classify_tasks_batch_with_ai
+from .http_client import get_ai_client, close_ai_clients
 
-__all__ = ["classify_task_with_ai"]
\ No newline at end of file
+__all__ = ["classify_task_with_ai", "classify_tasks_batch_with_ai", "get_ai_client", "close_ai_clients"]
@@ -1,152 +1,345 @@
+import asyncio
+import copy
 import logging
+import time
+import openai
 import yaml
-from typing import Dict, Optional
-from openai import OpenAI
-import httpx
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+from .http_client import get_ai_client
+from .classification_cache import classification_cache, make_cache_key
+from .single_flight import SingleFlight
+from .retry import classify_error, default_retry_policy, get_rate_limiter
+from .circuit_breaker import get_circuit_breaker
+from .local_classifier import local_classifier
+from .metrics import (
+    LLM_CALL_DURATION, LLM_CLASSIFICATION_ATTEMPTS, LLM_CLASSIFICATION_RESULTS, LLM_RESPONSE_COERCIONS, LLM_RESPONSE_FAILURES,
+    LLM_STREAM_EARLY_STOPS, record_classification, record_token_usage
+)
+from .tracing import trace_span
+from .stream_parser import ClassificationStreamParser
+from .structured_output import (
+    coerce_classification, is_response_format_error, loads_json, mark_unsupported, response_format_for
+)
+from .provider_router import provider_router
+from .prompt_builder import PROMPT_VERSION, build_batch_messages, build_single_task_messages, estimate_usage, response_usage
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Concurrent classifications of identical tasks share one provider call
+classification_flights = SingleFlight()
+
 async def classify_task_with_ai(task_title: str, task_description: str, provider_url: str, api_token: str, model_name: str) -> Optional[Dict]:
     """
-    Classify a task using AI and return structured data in YAML format
+    Classify a task, trying the classification cache and the local classifier before the AI provider.
+
+    The result's "tier" tells which one answered: cache, local, llm or fallback.
+    "confidence" is set for local answers only.
     """
-    prompt = f"""
-    Analyze the following task and provide classification in YAML format:
+    with trace_span("classify_task", **{"llm.provider": provider_url, "llm.model": model_name}) as span:
+        classification_result = await _classify_task(task_title, task_description, provider_url, api_token, model_name)
+        span.set_attribute("classification.tier", classification_result["tier"])
+        return classification_result
+
+async def _classify_task(task_title: str, task_description: str, provider_url: str, api_token: str, model_name: str) -> Dict:
+    cache_key = make_cache_key(task_title, task_description, model_name, PROMPT_VERSION)
+    cached_result = await classification_cache.get(cache_key)
+    if cached_result is not None:
+        logger.info(f"Classification cache hit for task '{task_title}'")
+        classification_result = {**cached_result, "tier": "cache", "confidence": None}
+        record_classification(classification_result)
+        return classification_result
 
-    Task Title: {task_title}
-    Task Description: {task_description}
+    # Trivially classifiable tasks are answered locally without calling the provider
+    local_result = classify_locally(task_title, task_description)
+    if local_result is not None:
+        record_classification(local_result)
+        return local_result
 
-    Please provide the following information in YAML format:
-    - priority: High, Medium, or Low
-    - category: Work, Personal, Learning, Health, or Other
-    - estimated_time_minutes: Approximate time in minutes to complete the task
-    - subtasks: A list of subtasks if applicable, otherwise null
+    async def classify_and_cache() -> Dict:
+        # The router may answer with another configured backend if it is faster or the requested one fails
+        classification_result, backend = await provider_router.classify(
+            provider_url, api_token, model_name,
+            lambda backend: _classify_with_provider(task_title, task_description, backend.provider_url, backend.api_token, backend.model_name)
+        )
+        # Only cache real AI answers, never fallback values, under the model that gave them
+        if classification_result.get("used_fallback") is False:
+            answer_key = cache_key if backend.model_name == model_name else make_cache_key(task_title, task_description, backend.model_name, PROMPT_VERSION)
+            await classification_cache.set(answer_key, classification_result, backend.model_name, PROMPT_VERSION)
+        return classification_result
 
-    Example format:
-    ```yaml
-    priority: High
-    category: Work
-    estimated_time_minutes: 60
-    subtasks:
-      - Research requirements
-      - Draft initial proposal
-      - Review with stakeholders
-    ```
+    # The flight key also covers the provider so different accounts never share a call
+    flight_key = f"{cache_key}:{provider_url}:{api_token}"
+    classification_result = await classification_flights.do(flight_key, classify_and_cache)
 
-    Only respond with the YAML content, nothing else.
+    # Each caller gets its own copy of the shared result
+    classification_result = copy.deepcopy(classification_result)
+    classification_result["tier"] = "fallback" if classification_result.get("used_fallback") else "llm"
+    classification_result["confidence"] = None
+    record_classification(classification_result)
+    return classification_result
+
+def classify_locally(task_title: str, task_description: str) -> Optional[Dict]:
+    """
+    Classify a task with the local classifier tier, or return None if it isn't confident enough
     """
+    if not settings.local_classifier_enabled:
+        return None
 
+    local_result = local_classifier.classify(task_title, task_description)
+    if local_result is not None:
+        logger.info(f"Local classifier answered for task '{task_title}' (confidence {local_result['confidence']})")
+        local_result["tier"] = "local"
+    return local_result
+
+async def _classify_with_provider(task_title: str, task_description: str, provider_url: str, api_token: str, model_name: str) -> Dict:
+    """
+    Classify a task using the AI provider and return structured data in YAML format
+    """
     # Log the parameters for debugging
     logger.info(f"Attempting AI classification with provider: {provider_url}")
     logger.info(f"Model: {model_name}")
     logger.info(f"Token provided: {'Yes' if api_token else 'No'}")
     logger.info(f"Token length: {len(api_token) if api_token else 0}")
 
-    # Create a client with the provided parameters and custom headers for OpenRouter
-    # OpenRouter sometimes requires additional headers for authentication
-    headers = {
-        "Authorization": f"Bearer {api_token}",
-        "Content-Type": "application/json"
-    }
+    # Reuse the pooled async client for this provider so the event loop is never blocked
+    # and keep-alive connections are shared between requests
+    client = get_ai_client(provider_url, api_token)
+    rate_limiter = get_rate_limiter(provider_url)
+    circuit_breaker = get_circuit_breaker(provider_url, model_name)
+    retry_policy = default_retry_policy
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + retry_policy.deadline
+    calls = 0
+
+    def finish(result: Dict, outcome: str) -> Dict:
+        LLM_CLASSIFICATION_RESULTS.labels(provider=provider_url, model=model_name, result=outcome).inc()
+        if calls:
+            LLM_CLASSIFICATION_ATTEMPTS.labels(provider=provider_url, model=model_name).observe(calls)
+        return result
+
+    def response_failed(reason: str):
+        LLM_RESPONSE_FAILURES.labels(provider=provider_url, model=model_name, reason=reason).inc()
 
-    # Add referer header for OpenRouter free tier access
-    if "openrouter.ai" in provider_url:
-        headers["HTTP-Referer"] = "http://localhost:8000"  # Local development
-        headers["X-Title"] = "AI Task Helper"  # App name for OpenRouter analytics
+    for attempt in range(retry_policy.max_attempts):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            logger.error("Retry deadline exhausted - returning default values")
+            break
 
-    # Create custom httpx client with headers
-    http_client = httpx.Client(headers=headers)
+        # Wait for the provider's rate limit instead of provoking a 429
+        if not await rate_limiter.acquire(timeout=remaining):
+            logger.error("Rate limiter wait exceeds the retry deadline - returning default values")
+            break
 
-    client = OpenAI(
-        base_url=provider_url,
-        api_key=api_token,
-        http_client=http_client
-    )
+        # Fail fast while the provider is known to be down. From here on every path
+        # records a success or failure or releases the probe slot of a half-open circuit.
+        if not circuit_breaker.allow_request():
+            logger.warning(f"Circuit open for {provider_url} / {model_name} - returning default values immediately")
+            return finish({**fallback_classification(), "circuit_open": True}, "circuit_open")
 
-    max_retries = 3
-    for attempt in range(max_retries):
+        response_format = response_format_for(settings.llm_response_format, provider_url, model_name)
+        structured = response_format is not None
         try:
             logger.info(f"Making API call to {provider_url}/chat/completions, attempt {attempt + 1}")
             logger.info(f"Using model: {model_name}")
 
-            response = client.chat.completions.create(
-                model=model_name,  # Use the provided model
-                messages=[
-                    {"role": "system", "content": "You are an expert task classifier. Respond only with valid YAML format as requested."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
+            calls += 1
+            call_started = time.perf_counter()
+            with trace_span("llm.chat_completion", **{"llm.provider": provider_url, "llm.model": model_name, "llm.attempt": attempt + 1}) as span:
+                content, stopped_early, usage = await _request_classification(
+                    client,
+                    model_name,
+                    build_single_task_messages(task_title, task_description, structured),
+                    timeout=min(remaining, settings.llm_request_timeout),
+                    response_format=response_format
+                )
+                span.set_attribute("llm.stream_stopped_early", stopped_early)
+                _report_usage(provider_url, model_name, usage, span)
+            if stopped_early:
+                LLM_STREAM_EARLY_STOPS.labels(provider=provider_url, model=model_name).inc()
+            LLM_CALL_DURATION.labels(provider=provider_url, model=model_name, outcome="success").observe(time.perf_counter() - call_started)
+        except asyncio.CancelledError:
+            circuit_breaker.release_probe()
+            raise
+        except Exception as e:
+            decision = classify_error(e)
+            LLM_CALL_DURATION.labels(provider=provider_url, model=model_name, outcome=decision.reason).observe(time.perf_counter() - call_started)
+            if structured and isinstance(e, openai.BadRequestError) and is_response_format_error(e):
+                # The provider or model doesn't take response_format; ask for YAML right away.
+                # It did answer, which also frees a half-open circuit's probe slot.
+                circuit_breaker.record_success()
+                mark_unsupported(provider_url, model_name)
+                continue
+            logger.error(f"Error in AI classification (attempt {attempt + 1}, reason: {decision.reason}): {str(e)}")
+            if decision.retryable or decision.reason == "authentication":
+                circuit_breaker.record_failure()
+            elif decision.status_code is not None:
+                # The provider answered (e.g. 400, 404 or 422), it just rejected this request
+                circuit_breaker.record_success()
+            else:
+                circuit_breaker.release_probe()
 
-            logger.info(f"API call successful, response type: {type(response)}")
+            if decision.retry_after is not None:
+                # Make every request to this provider honor the requested wait
+                rate_limiter.pause(decision.retry_after)
+            if not decision.retryable:
+                logger.error(f"Non-retryable error ({decision.reason}) - returning default values immediately")
+                break
+            if attempt == retry_policy.max_attempts - 1:
+                logger.error("All retries exhausted - returning default values")
+                break
+
+            delay = max(decision.retry_after or 0.0, retry_policy.backoff(attempt))
+            if loop.time() + delay >= deadline:
+                logger.error(f"Retry in {delay:.2f}s would exceed the deadline - returning default values")
+                break
+            logger.warning(f"Retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        circuit_breaker.record_success()
+        logger.info("API call successful" + (", stopped reading once the classification was complete" if stopped_early else ""))
+
+        if not content:
+            logger.error(f"Empty response on attempt {attempt + 1}")
+            response_failed("empty")
+            continue
+
+        logger.info(f"Response content preview: {content[:100]}...")
 
-            # Check if response is valid before accessing attributes
-            if not hasattr(response, 'choices') or not response.choices:
-                logger.error(f"Invalid response structure on attempt {attempt + 1}: {type(response)}")
+        # Parse the response; YAML also covers JSON that isn't strictly valid
+        try:
+            parsed_response = loads_json(content) if structured else yaml.safe_load(content)
+        except ValueError:
+            try:
+                parsed_response = yaml.safe_load(content)
+            except yaml.YAMLError as e:
+                logger.warning(f"Response is not valid JSON on attempt {attempt + 1}: {str(e)}")
+                response_failed("json_parse")
                 continue
+        except yaml.YAMLError as e:
+            logger.warning(f"Response is not valid YAML on attempt {attempt + 1}: {str(e)}")
+            response_failed("yaml_parse")
+            continue
 
-            # Extract the response content
-            content = response.choices[0].message.content.strip()
-            logger.info(f"Response content preview: {content[:100]}...")
-
-            # Remove markdown code block markers if present
-            if content.startswith("```yaml") and content.endswith("```"):
-                content = content[7:-3].strip()
-            elif content.startswith("```") and content.endswith("```"):
-                content = content[3:-3].strip()
-
-            # Parse the YAML response
-            parsed_response = yaml.safe_load(content)
-
-            # Validate the response structure
-            if validate_classification(parsed_response):
-                logger.info("Classification successful, returning parsed response")
-                return {
-                    "priority": parsed_response["priority"],
-                    "category": parsed_response["category"],
-                    "estimated_time_minutes": parsed_response.get("estimated_time_minutes"),
-                    "subtasks": parsed_response.get("subtasks"),
-                    "used_fallback": False
-                }
-            else:
-                logger.warning(f"Parsed response failed validation on attempt {attempt + 1}")
-                continue  # Retry if validation fails
+        # Fix near misses like "60 minutes" or "high" instead of spending another call on them
+        coerced_response = coerce_classification(parsed_response)
+        if coerced_response != parsed_response:
+            LLM_RESPONSE_COERCIONS.labels(provider=provider_url, model=model_name).inc()
+        parsed_response = coerced_response
 
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Error in AI classification (attempt {attempt + 1}): {error_msg}")
-            logger.exception("Full traceback:")  # This will log the full stack trace
-
-            # Check if it's an authentication error
-            if "401" in error_msg or "User not found" in error_msg or "Authentication" in error_msg:
-                logger.error("Authentication error detected - returning default values immediately")
-                break  # Don't retry if it's an auth error
-            elif "429" in error_msg or "rate" in error_msg.lower():
-                logger.warning("Rate limit error detected - continuing to retry")
-                continue  # Continue retrying for rate limits
-            elif "Connection error" in error_msg or "connection" in error_msg.lower():
-                logger.error(f"Connection error on attempt {attempt + 1}, will retry: {error_msg}")
-                if attempt == max_retries - 1:
-                    logger.error("All connection retries exhausted - returning default values")
-                    return {
-                        "priority": "Medium",
-                        "category": "Other",
-                        "estimated_time_minutes": 30,
-                        "subtasks": None
-                    }
-            elif attempt == max_retries - 1:
-                # Return default values if all retries fail
-                logger.error("All retries exhausted - returning default values")
-                return {
-                    "priority": "Medium",
-                    "category": "Other",
-                    "estimated_time_minutes": 30,
-                    "subtasks": None
-                }
-
-    # If all attempts fail or auth error occurs, return default values
+        # Validate the response structure
+        if validate_classification(parsed_response):
+            logger.info("Classification successful, returning parsed response")
+            return finish({
+                "priority": parsed_response["priority"],
+                "category": parsed_response["category"],
+                "estimated_time_minutes": parsed_response.get("estimated_time_minutes"),
+                "subtasks": parsed_response.get("subtasks"),
+                "used_fallback": False
+            }, "success")
+        else:
+            logger.warning(f"Parsed response failed validation on attempt {attempt + 1}")
+            response_failed("validation")
+            continue  # Retry if validation fails
+
+    # If all attempts fail or a non-retryable error occurs, return default values
     logger.warning("Returning fallback values after all attempts")
+    return finish(fallback_classification(), "fallback")
+
+def _report_usage(provider_url: str, model_name: str, usage: Optional[Dict], span=None):
+    """Log and record the token usage of one provider call"""
+    if usage is None:
+        return
+    record_token_usage(provider_url, model_name, usage["prompt_tokens"], usage["completion_tokens"])
+    if span is not None:
+        span.set_attribute("llm.usage.prompt_tokens", usage["prompt_tokens"])
+        span.set_attribute("llm.usage.completion_tokens", usage["completion_tokens"])
+    logger.info(f"Token usage: {usage['prompt_tokens']} prompt, {usage['completion_tokens']} completion"
+                + (" (estimated)" if usage.get("estimated") else ""))
+
+async def _request_classification(client, model_name: str, messages: List[Dict], timeout: float,
+                                  response_format: Optional[Dict] = None) -> Tuple[Optional[str], bool, Optional[Dict]]:
+    """
+    Ask the provider for a single-task classification.
+
+    Returns the document of the answer (without code fences or the model's
+    commentary), whether a streamed answer was cut short, and the token usage
+    of the call. Usage comes from the response's usage field (requested with
+    stream_options on streams); streams closed before the provider reported it
+    are counted with the local tokenizer. In streaming mode
+    a YAML answer is read token by token and the request is closed as soon as
+    all classification fields have been received, so chatty models don't keep
+    generating (and billing) text nobody reads. Structured (JSON) answers have
+    no commentary to cut and are read to the end.
+    """
+    options = {"model": model_name, "messages": messages, "temperature": 0.3, "timeout": timeout}
+    if settings.llm_max_output_tokens:
+        options["max_tokens"] = settings.llm_max_output_tokens
+    if response_format is not None:
+        options["response_format"] = response_format
+
+    if not settings.llm_streaming:
+        response = await client.chat.completions.create(**options)
+        usage = response_usage(response)
+        if not getattr(response, "choices", None) or not response.choices[0].message.content:
+            return None, False, usage
+        content = response.choices[0].message.content
+        usage = usage or estimate_usage(messages, content)
+        if response_format is not None:
+            return strip_code_fences(content.strip()), False, usage
+        return extract_classification_document(content), False, usage
+
+    parser = ClassificationStreamParser() if response_format is None else None
+    received = []
+    stopped_early = False
+    usage = None
+    # The timeout bounds the connection and every wait for the next chunk
+    # Providers only report usage on streams when asked, in a last chunk without choices
+    stream = await client.chat.completions.create(**options, stream=True, stream_options={"include_usage": True})
+    try:
+        async for chunk in stream:
+            # Providers that report usage on streams send it with the last chunk
+            usage = response_usage(chunk) or usage
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if not text:
+                continue
+            received.append(text)
+            if parser is not None and parser.feed(text):
+                stopped_early = True
+                break
+    finally:
+        # Closing the response cancels the rest of the generation
+        await stream.close()
+
+    usage = usage or estimate_usage(messages, "".join(received))
+    content = strip_code_fences("".join(received).strip())
+    if parser is None:
+        return content or None, False, usage
+    parser.close()
+    return parser.document() or content or None, stopped_early, usage
+
+def extract_classification_document(content: str) -> str:
+    """
+    Return the YAML document of a complete answer, dropping code fences and any
+    text the model wrote before or after it
+    """
+    parser = ClassificationStreamParser()
+    parser.feed(content)
+    parser.close()
+    return parser.document() or strip_code_fences(content.strip())
+
+def fallback_classification() -> Dict:
+    """
+    Default classification used when the AI provider can't classify a task
+    """
     return {
         "priority": "Medium",
         "category": "Other",
@@ -155,6 +348,164 @@ async def classify_task_with_ai(task_title: str, task_description: str, provider
         "used_fallback": True
     }
 
+async def classify_tasks_batch_with_ai(tasks: List[Tuple[str, str]], provider_url: str, api_token: str, model_name: str) -> List[Dict]:
+    """
+    Classify many tasks at once by packing several of them into each AI prompt.
+
+    Returns one classification per input task, in input order. Items answered by the
+    cache are not sent to the provider, and items missing or invalid in a batch
+    response fall back to single-task classification.
+    """
+    results: List[Optional[Dict]] = [None] * len(tasks)
+    cache_keys = [make_cache_key(title, description, model_name, PROMPT_VERSION) for title, description in tasks]
+
+    pending = []
+    for index, cache_key in enumerate(cache_keys):
+        cached_result = await classification_cache.get(cache_key)
+        if cached_result is not None:
+            results[index] = {**cached_result, "tier": "cache", "confidence": None}
+            record_classification(results[index])
+            continue
+        local_result = classify_locally(*tasks[index])
+        if local_result is not None:
+            results[index] = local_result
+            record_classification(local_result)
+        else:
+            pending.append(index)
+
+    logger.info(f"Bulk classification of {len(tasks)} tasks: {len(tasks) - len(pending)} answered by cache or local classifier, "
+                f"{len(pending)} to classify with model {model_name}")
+
+    batch_size = max(1, settings.bulk_classification_batch_size)
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    semaphore = asyncio.Semaphore(max(1, settings.bulk_classification_concurrency))
+
+    async def run_batch(batch: List[int]):
+        batch_tasks = [tasks[index] for index in batch]
+
+        async def call(backend) -> Dict:
+            batch_results = await _classify_batch_with_provider(batch_tasks, backend.provider_url, backend.api_token, backend.model_name)
+            if batch_results is None:
+                return {"used_fallback": True, "circuit_open": True}
+            return {"used_fallback": all(result is None for result in batch_results), "results": batch_results}
+
+        async with semaphore:
+            # Fails over to the next backend when a whole batch goes unanswered
+            answer, backend = await provider_router.classify(provider_url, api_token, model_name, call, batch=True)
+        batch_results = answer.get("results") or [None] * len(batch)
+
+        for index, classification_result in zip(batch, batch_results):
+            if classification_result is not None:
+                answer_key = cache_keys[index] if backend.model_name == model_name else make_cache_key(*tasks[index], backend.model_name, PROMPT_VERSION)
+                await classification_cache.set(answer_key, classification_result, backend.model_name, PROMPT_VERSION)
+                results[index] = {**classification_result, "tier": "llm", "confidence": None}
+                record_classification(results[index])
+
+        # Per-item fallback for tasks the batch response did not classify correctly
+        failed = [index for index, classification_result in zip(batch, batch_results) if classification_result is None]
+        if failed:
+            logger.warning(f"{len(failed)} of {len(batch)} batched tasks were not classified, classifying them individually")
+        for index in failed:
+            async with semaphore:
+                title, description = tasks[index]
+                results[index] = await classify_task_with_ai(title, description, provider_url, api_token, model_name)
+
+    await asyncio.gather(*(run_batch(batch) for batch in batches))
+    return results
+
+async def _classify_batch_with_provider(tasks: List[Tuple[str, str]], provider_url: str, api_token: str, model_name: str) -> Optional[List[Optional[Dict]]]:
+    """
+    Classify a batch of tasks with a single AI call, returning None for items that failed validation,
+    or None instead of a list while the provider's circuit is open
+    """
+    messages = build_batch_messages(tasks)
+
+    client = get_ai_client(provider_url, api_token)
+    circuit_breaker = get_circuit_breaker(provider_url, model_name)
+    if not await get_rate_limiter(provider_url).acquire(timeout=settings.llm_retry_deadline):
+        logger.error("Rate limiter wait for batched classification exceeds the retry deadline")
+        return [None] * len(tasks)
+    if not circuit_breaker.allow_request():
+        logger.warning(f"Circuit open for {provider_url} / {model_name} - skipping batched classification")
+        return None
+
+    try:
+        logger.info(f"Making batched API call to {provider_url}/chat/completions for {len(tasks)} tasks")
+        call_started = time.perf_counter()
+        with trace_span("llm.chat_completion", **{"llm.provider": provider_url, "llm.model": model_name, "llm.batch_size": len(tasks)}) as span:
+            response = await client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                temperature=0.3,
+                timeout=settings.llm_request_timeout
+            )
+            usage = response_usage(response)
+            if usage is None and getattr(response, "choices", None):
+                usage = estimate_usage(messages, response.choices[0].message.content)
+            _report_usage(provider_url, model_name, usage, span)
+        LLM_CALL_DURATION.labels(provider=provider_url, model=model_name, outcome="success").observe(time.perf_counter() - call_started)
+    except asyncio.CancelledError:
+        circuit_breaker.release_probe()
+        raise
+    except Exception as e:
+        decision = classify_error(e)
+        LLM_CALL_DURATION.labels(provider=provider_url, model=model_name, outcome=decision.reason).observe(time.perf_counter() - call_started)
+        if decision.retryable or decision.reason == "authentication":
+            circuit_breaker.record_failure()
+        elif decision.status_code is not None:
+            circuit_breaker.record_success()
+        else:
+            circuit_breaker.release_probe()
+        logger.error(f"Error in batched AI classification (reason: {decision.reason}): {str(e)}")
+        return [None] * len(tasks)
+
+    circuit_breaker.record_success()
+    try:
+        content = response.choices[0].message.content.strip()
+        parsed_response = yaml.safe_load(strip_code_fences(content))
+    except Exception as e:
+        logger.error(f"Could not parse batched AI classification: {str(e)}")
+        LLM_RESPONSE_FAILURES.labels(provider=provider_url, model=model_name, reason="yaml_parse").inc()
+        return [None] * len(tasks)
+
+    if isinstance(parsed_response, dict):
+        # Some models wrap the list, e.g. {"tasks": [...]}
+        parsed_response = next((value for value in parsed_response.values() if isinstance(value, list)), None)
+    if not isinstance(parsed_response, list):
+        logger.warning("Batched classification response is not a YAML list")
+        LLM_RESPONSE_FAILURES.labels(provider=provider_url, model=model_name, reason="validation").inc()
+        return [None] * len(tasks)
+
+    results: List[Optional[Dict]] = [None] * len(tasks)
+    for position, item in enumerate(parsed_response):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index", position + 1)
+        if not isinstance(index, int) or not 1 <= index <= len(tasks):
+            continue
+        item = coerce_classification(item)
+        if validate_classification(item):
+            results[index - 1] = {
+                "priority": item["priority"],
+                "category": item["category"],
+                "estimated_time_minutes": item.get("estimated_time_minutes"),
+                "subtasks": item.get("subtasks"),
+                "used_fallback": False
+            }
+        else:
+            LLM_RESPONSE_FAILURES.labels(provider=provider_url, model=model_name, reason="validation").inc()
+    return results
+
+def strip_code_fences(content: str) -> str:
+    """
+    Remove markdown code block markers around an AI response if present
+    """
+    if content.startswith("```yaml") and content.endswith("```"):
+        return content[7:-3].strip()
+    elif content.startswith("```") and content.endswith("```"):
+        return content[3:-3].strip()
+    return content
+
 def validate_classification(data: Dict) -> bool:
     """
     Validate the classification data returned by AI
@@ -0,0 +1,133 @@
+import logging
+import time
+from enum import Enum
+from typing import Dict, Tuple
+
+from config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class CircuitStateEnum(Enum):
+    CLOSED = "closed"  # Requests go to the provider
+    OPEN = "open"  # Provider is failing, requests fall back immediately
+    HALF_OPEN = "half_open"  # Letting a few probe requests through to test recovery
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one (provider_url, model_name) pair.
+
+    Opens after consecutive failures, rejects requests while open, and after the
+    recovery timeout lets a limited number of probe requests through. A successful
+    probe closes the circuit, a failed one opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float, half_open_max_probes: int):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_probes = half_open_max_probes
+        self._state = CircuitStateEnum.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._last_probe_at = 0.0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> CircuitStateEnum:
+        if self._state == CircuitStateEnum.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = CircuitStateEnum.HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == CircuitStateEnum.CLOSED:
+            return True
+
+        if state == CircuitStateEnum.HALF_OPEN:
+            now = time.monotonic()
+            # Probes that never reported back (e.g. cancelled requests) stop counting after a recovery timeout
+            if self._probes_in_flight >= self.half_open_max_probes and now - self._last_probe_at >= self.recovery_timeout:
+                self._probes_in_flight = 0
+            if self._probes_in_flight < self.half_open_max_probes:
+                self._probes_in_flight += 1
+                self._last_probe_at = now
+                return True
+
+        self.rejected += 1
+        return False
+
+    def retry_in(self) -> float:
+        """Seconds until the circuit lets probe requests through again"""
+        if self.state != CircuitStateEnum.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        if self._state != CircuitStateEnum.CLOSED:
+            logger.info("Circuit closed after successful probe")
+        self._state = CircuitStateEnum.CLOSED
+        self._consecutive_failures = 0
+        self._probes_in_flight = 0
+
+    def release_probe(self):
+        """Give back the probe slot of a request that ended without showing whether the provider works"""
+        if self._state == CircuitStateEnum.HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    def record_failure(self):
+        self._consecutive_failures += 1
+        if self._state == CircuitStateEnum.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self._state != CircuitStateEnum.OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit opened after {self._consecutive_failures} consecutive failures")
+            self._state = CircuitStateEnum.OPEN
+            self._opened_at = time.monotonic()
+            self._probes_in_flight = 0
+
+    def reset(self):
+        self._state = CircuitStateEnum.CLOSED
+        self._consecutive_failures = 0
+        self._probes_in_flight = 0
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self._consecutive_failures,
+            "retry_in_seconds": round(self.retry_in(), 2),
+            "rejected": self.rejected,
+            "times_opened": self.times_opened
+        }
+
+
+# One circuit breaker per (provider_url, model_name)
+_circuit_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider_url: str, model_name: str) -> CircuitBreaker:
+    key = (provider_url, model_name)
+    breaker = _circuit_breakers.get(key)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            failure_threshold=settings.circuit_breaker_failure_threshold,
+            recovery_timeout=settings.circuit_breaker_recovery_timeout,
+            half_open_max_probes=settings.circuit_breaker_half_open_probes
+        )
+        _circuit_breakers[key] = breaker
+    return breaker
+
+
+def circuit_breaker_stats() -> list:
+    return [
+        {"provider_url": provider_url, "model_name": model_name, **breaker.stats()}
+        for (provider_url, model_name), breaker in _circuit_breakers.items()
+    ]
+
+
+def reset_circuit_breakers():
+    for breaker in _circuit_breakers.values():
+        breaker.reset()
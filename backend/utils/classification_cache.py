@@ -0,0 +1,225 @@
+import copy
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Purge expired rows from the persistent tier once every this many writes
+PERSISTENT_PURGE_INTERVAL = 100
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Normalize free text so that trivially different inputs share a cache key
+    """
+    return " ".join((text or "").lower().split())
+
+
+def make_cache_key(task_title: str, task_description: str, model_name: str, prompt_version: str) -> str:
+    """
+    Build a content-addressed cache key for a classification request
+    """
+    parts = [
+        normalize_text(task_title),
+        normalize_text(task_description),
+        model_name.strip(),
+        prompt_version
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with a per-entry TTL
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class PostgresCacheTier:
+    """
+    Persistent cache tier stored in the classification_cache table
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._writes = 0
+
+    async def _get(self, key: str) -> Optional[Dict]:
+        from models.database import get_async_session_local
+        from models.classification_cache import ClassificationCacheEntry
+
+        async with get_async_session_local()() as db:
+            entry = await db.get(ClassificationCacheEntry, key)
+            if entry is None or entry.expires_at <= datetime.utcnow():
+                return None
+            return entry.result
+
+    async def _set(self, key: str, value: Dict, model_name: str, prompt_version: str):
+        from sqlalchemy import delete
+        from sqlalchemy.dialects.postgresql import insert
+        from models.database import get_async_session_local
+        from models.classification_cache import ClassificationCacheEntry
+
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+        stmt = insert(ClassificationCacheEntry).values(
+            key=key,
+            model_name=model_name,
+            prompt_version=prompt_version,
+            result=value,
+            created_at=now,
+            expires_at=expires_at
+        ).on_conflict_do_update(
+            index_elements=[ClassificationCacheEntry.key],
+            set_={"result": value, "created_at": now, "expires_at": expires_at}
+        )
+
+        async with get_async_session_local()() as db:
+            await db.execute(stmt)
+            self._writes += 1
+            if self._writes % PERSISTENT_PURGE_INTERVAL == 0:
+                await db.execute(delete(ClassificationCacheEntry).where(ClassificationCacheEntry.expires_at <= now))
+            await db.commit()
+
+    async def get(self, key: str) -> Optional[Dict]:
+        try:
+            value = await self._get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Persistent classification cache lookup failed: {str(e)}")
+            return None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict, model_name: str, prompt_version: str):
+        try:
+            await self._set(key, value, model_name, prompt_version)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Persistent classification cache write failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+class ClassificationCache:
+    """
+    Two-tier classification cache: in-process LRU in front of an optional Postgres tier
+    """
+
+    def __init__(self, enabled: bool, max_size: int, ttl_seconds: int, persistent: bool):
+        self.enabled = enabled
+        self.memory = LRUCache(max_size, ttl_seconds)
+        self.persistent = PostgresCacheTier(ttl_seconds) if persistent else None
+
+    async def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = await self.persistent.get(key)
+            if value is not None:
+                # Promote to the in-process tier for the next lookup
+                self.memory.set(key, value)
+
+        # Hand out copies so callers can't mutate the cached entry
+        return copy.deepcopy(value) if value is not None else None
+
+    async def set(self, key: str, value: Dict, model_name: str, prompt_version: str):
+        if not self.enabled:
+            return
+
+        value = copy.deepcopy(value)
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            await self.persistent.set(key, value, model_name, prompt_version)
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats() if self.persistent is not None else None
+        }
+
+
+classification_cache = ClassificationCache(
+    enabled=settings.classification_cache_enabled,
+    max_size=settings.classification_cache_max_size,
+    ttl_seconds=settings.classification_cache_ttl_seconds,
+    persistent=settings.classification_cache_persistent
+)
@@ -0,0 +1,275 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from config import settings
+from .ai_classifier import classify_task_with_ai
+from .circuit_breaker import get_circuit_breaker
+from .subtasks import normalize_subtasks
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Task fields set from the classification, left alone if the user changes them meanwhile
+CLASSIFIED_FIELDS = ("priority", "category", "estimated_time_minutes", "subtasks")
+
+
+class ClassificationWorkerPool:
+    """
+    Pool of asyncio workers that classify tasks queued in the classification_jobs table.
+
+    Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED and held under a lease,
+    so several processes can share the queue and jobs of a crashed process are
+    picked up again once their lease expires.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float, lease_seconds: int, max_attempts: int):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task_waiters: Dict[int, List[asyncio.Event]] = {}
+        self.completed = 0
+        self.failed = 0
+        self.deferred = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(worker_id), name=f"classification-worker-{worker_id}")
+            for worker_id in range(self.concurrency)
+        ]
+        logger.info(f"Started {self.concurrency} classification workers")
+
+    async def stop(self):
+        workers = self._workers
+        self._workers = []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        logger.info("Classification workers stopped")
+
+    def notify(self):
+        """Wake idle workers after new jobs were committed"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def wait_for_task(self, task_id: int, timeout: float) -> bool:
+        """
+        Wait until a worker in this process finishes the task or the timeout expires
+        """
+        event = asyncio.Event()
+        self._task_waiters.setdefault(task_id, []).append(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            waiters = self._task_waiters.get(task_id, [])
+            if event in waiters:
+                waiters.remove(event)
+            if not waiters:
+                self._task_waiters.pop(task_id, None)
+
+    def _notify_task_done(self, task_id: int):
+        for event in self._task_waiters.get(task_id, []):
+            event.set()
+
+    def stats(self) -> Dict:
+        return {
+            "workers": len(self._workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "deferred": self.deferred
+        }
+
+    async def _worker(self, worker_id: int):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim_job()
+            except Exception as e:
+                logger.error(f"Classification worker {worker_id} failed to claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._process_job(job)
+
+    async def _process_job(self, job: Dict):
+        logger.info(f"Classifying task ID {job['task_id']} in background (job {job['id']}, attempt {job['attempts']})")
+        try:
+            classification_result = await classify_task_with_ai(
+                job["title"],
+                job["description"] or "",
+                job["provider_url"],
+                job["api_token"],
+                job["model_name"]
+            )
+            if classification_result.get("circuit_open"):
+                # Provider is down: keep the task pending and retry once the circuit half-opens
+                delay = max(self.poll_interval, get_circuit_breaker(job["provider_url"], job["model_name"]).retry_in())
+                await self._defer_job(job, delay)
+                self.deferred += 1
+                logger.info(f"Circuit open, task ID {job['task_id']} re-queued for classification in {delay:.1f}s")
+                return
+            await self._complete_job(job, classification_result)
+            self.completed += 1
+        except asyncio.CancelledError:
+            # Leave the job leased; it is reclaimed after the lease expires
+            raise
+        except Exception as e:
+            logger.error(f"Background classification of task ID {job['task_id']} failed: {str(e)}")
+            try:
+                await self._fail_job(job, str(e))
+            except Exception as fail_error:
+                logger.error(f"Could not record failure of job {job['id']}: {str(fail_error)}")
+        self._notify_task_done(job["task_id"])
+
+    async def _claim_job(self) -> Optional[Dict]:
+        from sqlalchemy import and_, or_, select
+        from models.database import get_async_session_local
+        from models.classification_job import ClassificationJob, JobStatusEnum
+        from models.task import Task, ClassificationStatusEnum
+
+        now = datetime.utcnow()
+        async with get_async_session_local()() as db:
+            job = await db.scalar(
+                select(ClassificationJob).where(
+                    or_(
+                        and_(ClassificationJob.status == JobStatusEnum.QUEUED.value, ClassificationJob.available_at <= now),
+                        and_(ClassificationJob.status == JobStatusEnum.PROCESSING.value, ClassificationJob.locked_until < now)
+                    )
+                ).order_by(ClassificationJob.available_at, ClassificationJob.id).limit(1).with_for_update(skip_locked=True)
+            )
+            if job is None:
+                return None
+
+            task = await db.get(Task, job.task_id)
+            if task is None:
+                await db.delete(job)
+                await db.commit()
+                return None
+
+            job.status = JobStatusEnum.PROCESSING.value
+            job.attempts += 1
+            job.locked_until = now + timedelta(seconds=self.lease_seconds)
+            task.classification_status = ClassificationStatusEnum.PROCESSING.value
+            await db.commit()
+
+            return {
+                "id": job.id,
+                "task_id": job.task_id,
+                "title": task.title,
+                "description": task.description,
+                "provider_url": job.provider_url,
+                "api_token": job.api_token,
+                "model_name": job.model_name,
+                "attempts": job.attempts,
+                # What the task looked like when classification started, see _complete_job
+                "task_version": task.version,
+                "claimed_fields": {field: getattr(task, field) for field in CLASSIFIED_FIELDS}
+            }
+
+    async def _complete_job(self, job: Dict, classification_result: Dict):
+        from sqlalchemy import delete
+        from models.database import get_async_session_local
+        from models.classification_job import ClassificationJob
+        from models.task import Task, PriorityEnum, CategoryEnum, ClassificationStatusEnum
+
+        async with get_async_session_local()() as db:
+            task = await db.get(Task, job["task_id"])
+            if task is not None:
+                values = {
+                    "priority": PriorityEnum(classification_result["priority"]),
+                    "category": CategoryEnum(classification_result["category"]),
+                    "estimated_time_minutes": classification_result["estimated_time_minutes"],
+                    "subtasks": normalize_subtasks(classification_result["subtasks"])
+                }
+                if task.version != job["task_version"]:
+                    # The task was updated while it was being classified: keep the user's edits
+                    edited = [field for field in CLASSIFIED_FIELDS if getattr(task, field) != job["claimed_fields"][field]]
+                    for field in edited:
+                        del values[field]
+                    if edited:
+                        logger.info(f"Task ID {job['task_id']} was edited during classification, keeping its {', '.join(edited)}")
+                for field, value in values.items():
+                    setattr(task, field, value)
+                task.ai_processed = not classification_result.get("used_fallback", False)
+                task.classification_tier = classification_result.get("tier")
+                task.classification_confidence = classification_result.get("confidence")
+                task.classification_status = ClassificationStatusEnum.COMPLETED.value
+            await db.execute(delete(ClassificationJob).where(ClassificationJob.id == job["id"]))
+            await db.commit()
+            logger.info(f"Background classification of task ID {job['task_id']} completed")
+
+    async def _defer_job(self, job: Dict, delay: float):
+        from models.database import get_async_session_local
+        from models.classification_job import ClassificationJob, JobStatusEnum
+        from models.task import Task, ClassificationStatusEnum
+
+        async with get_async_session_local()() as db:
+            db_job = await db.get(ClassificationJob, job["id"])
+            if db_job is None:
+                return
+
+            # A deferral is not a failed attempt
+            db_job.attempts = max(0, db_job.attempts - 1)
+            db_job.status = JobStatusEnum.QUEUED.value
+            db_job.locked_until = None
+            db_job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+            task = await db.get(Task, job["task_id"])
+            if task is not None:
+                task.classification_status = ClassificationStatusEnum.PENDING.value
+            await db.commit()
+
+    async def _fail_job(self, job: Dict, error: str):
+        from models.database import get_async_session_local
+        from models.classification_job import ClassificationJob, JobStatusEnum
+        from models.task import Task, ClassificationStatusEnum
+
+        async with get_async_session_local()() as db:
+            db_job = await db.get(ClassificationJob, job["id"])
+            if db_job is None:
+                return
+
+            db_job.last_error = error
+            db_job.locked_until = None
+            task = await db.get(Task, job["task_id"])
+            if db_job.attempts >= self.max_attempts:
+                db_job.status = JobStatusEnum.FAILED.value
+                # Failed jobs are kept for their last_error; the caller's token is not needed anymore
+                db_job.api_token = ""
+                if task is not None:
+                    task.classification_status = ClassificationStatusEnum.FAILED.value
+                self.failed += 1
+            else:
+                # Retry later with exponential backoff
+                db_job.status = JobStatusEnum.QUEUED.value
+                db_job.available_at = datetime.utcnow() + timedelta(seconds=self.poll_interval * 2 ** db_job.attempts)
+                if task is not None:
+                    task.classification_status = ClassificationStatusEnum.PENDING.value
+            await db.commit()
+
+
+classification_worker = ClassificationWorkerPool(
+    concurrency=settings.classification_workers,
+    poll_interval=settings.classification_poll_interval,
+    lease_seconds=settings.classification_job_lease_seconds,
+    max_attempts=settings.classification_job_max_attempts
+)
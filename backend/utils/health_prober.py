@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import settings
+from .http_client import get_ai_client
+from .single_flight import SingleFlight
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def make_target_key(provider_url: str, api_token: str, model_name: str) -> str:
+    """
+    Identify a (provider, model, token) combination without keeping the token in the key
+    """
+    token_hash = hashlib.sha256((api_token or "").encode("utf-8")).hexdigest()
+    return "\x1f".join([provider_url.rstrip("/"), model_name.strip(), token_hash])
+
+
+class ProviderHealthProber:
+    """
+    Periodically checks every watched (provider, model) with a tiny chat completion
+    and caches the outcome, so health checks are answered without calling the provider.
+
+    A target is watched once its health is requested or it becomes the current
+    configuration, and is dropped after nobody asked about it for target_ttl seconds.
+    Concurrent probes of the same target share one provider call.
+    """
+
+    def __init__(self, interval: float, timeout: float, target_ttl: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.target_ttl = target_ttl
+        self._targets: Dict[str, Dict] = {}
+        self._results: Dict[str, Dict] = {}
+        self._flights = SingleFlight()
+        self._runner: Optional[asyncio.Task] = None
+        self.probes = 0
+        self.failures = 0
+        self.cached_answers = 0
+
+    async def start(self):
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run(), name="provider-health-prober")
+
+    async def stop(self):
+        runner = self._runner
+        self._runner = None
+        if runner is not None:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+    def watch(self, provider_url: str, api_token: str, model_name: str) -> str:
+        """Add a target to the background probes (or mark it as still in use)"""
+        key = make_target_key(provider_url, api_token, model_name)
+        self._targets[key] = {
+            "provider_url": provider_url,
+            "api_token": api_token,
+            "model_name": model_name,
+            "last_requested": time.monotonic()
+        }
+        return key
+
+    async def check(self, provider_url: str, api_token: str, model_name: str, force: bool = False) -> Dict:
+        """
+        Return the cached health of a target, probing it first if force is set or
+        there is no result from the last two probe intervals (e.g. probing is disabled)
+        """
+        key = self.watch(provider_url, api_token, model_name)
+        result = self._results.get(key)
+        fresh = result is not None and time.monotonic() - result["checked_at_monotonic"] < 2 * self.interval
+        if fresh and not force:
+            self.cached_answers += 1
+            return self._present(result, cached=True)
+
+        result = await self._flights.do(key, lambda: self._probe(key))
+        return self._present(result, cached=False)
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._runner is not None,
+            "interval_seconds": self.interval,
+            "targets": len(self._targets),
+            "probes": self.probes,
+            "failures": self.failures,
+            "cached_answers": self.cached_answers,
+            "results": [
+                {"provider_url": target["provider_url"], **self._present(self._results[key], cached=True)}
+                for key, target in self._targets.items()
+                if key in self._results
+            ]
+        }
+
+    def _present(self, result: Dict, cached: bool) -> Dict:
+        response = {name: value for name, value in result.items() if name != "checked_at_monotonic"}
+        response["cached"] = cached
+        response["age_seconds"] = round(time.monotonic() - result["checked_at_monotonic"], 3)
+        return response
+
+    async def _probe(self, key: str) -> Dict:
+        target = self._targets[key]
+        model_name = target["model_name"]
+        self.probes += 1
+        started = time.perf_counter()
+        try:
+            client = get_ai_client(target["provider_url"], target["api_token"])
+            await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=model_name,
+                    messages=[{"role": "user", "content": "Hello, are you there?"}],
+                    max_tokens=5
+                ),
+                timeout=self.timeout
+            )
+            result = {
+                "status": "healthy",
+                "api_access": True,
+                "message": f"AI provider API is accessible and token is valid with model {model_name}",
+                "model": model_name
+            }
+        except asyncio.TimeoutError:
+            self.failures += 1
+            result = {
+                "status": "unhealthy",
+                "api_access": False,
+                "message": f"AI provider API did not answer within {self.timeout:g}s",
+                "model": model_name
+            }
+        except Exception as e:
+            self.failures += 1
+            result = {
+                "status": "unhealthy",
+                "api_access": False,
+                "message": f"AI provider API error: {str(e)}",
+                "model": model_name
+            }
+
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["checked_at"] = datetime.utcnow().isoformat()
+        result["checked_at_monotonic"] = time.monotonic()
+        if key in self._targets:
+            self._results[key] = result
+        return result
+
+    def _drop_idle_targets(self) -> List[str]:
+        now = time.monotonic()
+        idle = [key for key, target in self._targets.items() if now - target["last_requested"] > self.target_ttl]
+        for key in idle:
+            del self._targets[key]
+            self._results.pop(key, None)
+        return idle
+
+    async def _run(self):
+        while True:
+            idle = self._drop_idle_targets()
+            if idle:
+                logger.info(f"Stopped probing {len(idle)} idle provider health targets")
+
+            keys = list(self._targets)
+            if keys:
+                await asyncio.gather(
+                    *(self._flights.do(key, lambda key=key: self._probe(key)) for key in keys),
+                    return_exceptions=True
+                )
+                unhealthy = sum(1 for key in keys if self._results.get(key, {}).get("status") == "unhealthy")
+                if unhealthy:
+                    logger.warning(f"{unhealthy} of {len(keys)} AI provider health probes failed")
+            await asyncio.sleep(self.interval)
+
+
+provider_health_prober = ProviderHealthProber(
+    interval=settings.health_probe_interval,
+    timeout=settings.health_probe_timeout,
+    target_ttl=settings.health_probe_target_ttl
+)
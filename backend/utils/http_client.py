@@ -0,0 +1,112 @@
+import asyncio
+import importlib.util
+import logging
+from collections import OrderedDict
+from typing import Dict
+from openai import AsyncOpenAI
+import httpx
+
+from config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Process-wide pool of AI provider clients keyed by provider_url, least recently used first.
+# Tokens are per request (see get_ai_client), so callers can't grow the pool with new tokens.
+_clients: "OrderedDict[str, AsyncOpenAI]" = OrderedDict()
+# Evicted clients by the task that closes them once their in-flight requests had time to finish
+_pending_closes: Dict[asyncio.Task, AsyncOpenAI] = {}
+
+
+def build_provider_headers(provider_url: str) -> Dict[str, str]:
+    """
+    Build the HTTP headers sent with every request to the AI provider.
+    The Authorization header is added per request by the OpenAI client.
+    """
+    headers = {
+        "Content-Type": "application/json"
+    }
+
+    # Add referer header for OpenRouter free tier access
+    if "openrouter.ai" in provider_url:
+        headers["HTTP-Referer"] = "http://localhost:8000"  # Local development
+        headers["X-Title"] = "AI Task Helper"  # App name for OpenRouter analytics
+
+    return headers
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+async def _close_client(client: AsyncOpenAI, delay: float = 0.0):
+    await asyncio.sleep(delay)
+    try:
+        await client.close()
+    except Exception as e:
+        logger.warning(f"Error closing AI client: {str(e)}")
+
+
+def _evict_clients():
+    while len(_clients) > max(1, settings.llm_max_provider_clients):
+        provider_url, client = _clients.popitem(last=False)
+        logger.info(f"Closing pooled AI client for provider: {provider_url}")
+        try:
+            # Requests still running on the client get up to the request timeout to finish
+            task = asyncio.get_running_loop().create_task(_close_client(client, settings.llm_request_timeout))
+        except RuntimeError:
+            continue
+        _pending_closes[task] = client
+        task.add_done_callback(lambda done: _pending_closes.pop(done, None))
+
+
+def get_ai_client(provider_url: str, api_token: str) -> AsyncOpenAI:
+    """
+    Return an AsyncOpenAI client for the provider that sends the given token.
+
+    Clients of the same provider share one connection pool, kept alive between requests,
+    so repeated calls reuse the TCP/TLS connection instead of opening a new one.
+    """
+    client = _clients.get(provider_url)
+    if client is not None:
+        _clients.move_to_end(provider_url)
+        return client.with_options(api_key=api_token)
+
+    use_http2 = settings.llm_http2 and _http2_available()
+    if settings.llm_http2 and not use_http2:
+        logger.warning("HTTP/2 requested for AI provider clients but 'h2' is not installed, using HTTP/1.1")
+
+    http_client = httpx.AsyncClient(
+        headers=build_provider_headers(provider_url),
+        http2=use_http2,
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry
+        ),
+        timeout=httpx.Timeout(settings.llm_request_timeout, connect=settings.llm_connect_timeout)
+    )
+
+    client = AsyncOpenAI(
+        base_url=provider_url,
+        api_key=api_token,
+        http_client=http_client,
+        max_retries=0  # Retries are handled by the classifier's retry policy
+    )
+    _clients[provider_url] = client
+    _evict_clients()
+    logger.info(f"Created pooled AI client for provider: {provider_url} (http2={use_http2})")
+    return client
+
+
+async def close_ai_clients():
+    """
+    Close all pooled AI provider clients and their connections
+    """
+    clients = list(_clients.values())
+    _clients.clear()
+    for task, client in list(_pending_closes.items()):
+        task.cancel()
+        clients.append(client)
+    for client in clients:
+        await _close_client(client)
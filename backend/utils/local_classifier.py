@@ -0,0 +1,428 @@
+import json
+import logging
+import math
+import os
+import re
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "the", "to", "for", "of", "in", "on", "at", "with", "my", "our",
+    "is", "it", "this", "that", "be", "do", "from", "by", "or", "as", "up", "some"
+}
+
+# Keyword rules for tasks that need no AI: (keywords, category, priority, estimated_time_minutes).
+# A rule matches when any keyword (single token or phrase) appears in the task title. Keywords
+# are phrases or words with one obvious reading; words like "rent", "report" or "sync" are not.
+# The first keyword names the rule.
+KEYWORD_RULES = [
+    (["go to gym", "gym", "workout", "yoga class", "go jogging", "go for a run"], "Health", "Medium", 60),
+    (["dentist appointment", "doctor appointment", "dentist", "annual checkup", "refill prescription"], "Health", "High", 30),
+    (["pay rent", "pay bill", "pay bills", "pay taxes", "file taxes"], "Personal", "High", 15),
+    (["buy groceries", "grocery shopping", "do laundry", "wash dishes", "do dishes", "do the dishes"], "Personal", "Medium", 45),
+    (["call mom", "call dad", "birthday gift", "birthday present"], "Personal", "Medium", 30),
+    (["fix bug", "hotfix", "code review", "review pull request", "deploy to production"], "Work", "High", 60),
+    (["daily standup", "standup", "team meeting", "answer emails", "reply to emails", "status report"], "Work", "Medium", 30),
+    (["do homework", "homework", "online course", "study for exam", "watch tutorial"], "Learning", "Medium", 60),
+]
+
+# Priority keywords override the rule's default priority
+PRIORITY_KEYWORDS = {
+    "High": ["urgent", "asap", "today", "deadline", "immediately", "critical", "overdue"],
+    "Low": ["someday", "maybe", "eventually", "optional", "whenever"],
+}
+
+# Confidence of a rule until retraining measured how often it agrees with the AI's labels.
+# It stays below the default threshold, so uncalibrated rules escalate to the AI.
+RULE_PRIOR_CONFIDENCE = 0.75
+# Matching AI-classified tasks needed before a rule's measured agreement replaces the prior
+RULE_MIN_MATCHES = 5
+
+# Naive Bayes posteriors are overconfident, so the models answer with their measured precision
+# instead: every HOLDOUT_EVERY-th training task is held out to measure how often predictions
+# with a posterior of at least each edge got both labels right
+HOLDOUT_EVERY = 5
+CONFIDENCE_EDGES = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99)
+
+# Seconds between checks whether another process saved a retrained model
+MODEL_CHECK_INTERVAL = 5.0
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+def _contains_phrase(tokens: List[str], phrase: str) -> bool:
+    words = phrase.split()
+    if len(words) == 1:
+        return words[0] in tokens
+    return any(tokens[i:i + len(words)] == words for i in range(len(tokens) - len(words) + 1))
+
+
+def classify_with_rules(task_title: str, rule_confidence: Optional[Dict[str, float]] = None) -> Optional[Dict]:
+    """
+    Classify a task from keywords in its title, or return None if no single rule applies.
+
+    The confidence is the rule's measured agreement with the AI from rule_confidence,
+    or RULE_PRIOR_CONFIDENCE for rules that weren't calibrated yet.
+    """
+    tokens = TOKEN_PATTERN.findall((task_title or "").lower())
+    matches = [
+        (keywords[0], category, priority, minutes)
+        for keywords, category, priority, minutes in KEYWORD_RULES
+        if any(_contains_phrase(tokens, keyword) for keyword in keywords)
+    ]
+    # Conflicting rules (e.g. "study for doctor appointment") are left to the other tiers
+    if not matches or len({category for _, category, _, _ in matches}) > 1:
+        return None
+
+    rule, category, priority, minutes = matches[0]
+    for keyword_priority, keywords in PRIORITY_KEYWORDS.items():
+        if any(keyword in tokens for keyword in keywords):
+            priority = keyword_priority
+            break
+
+    return {
+        "priority": priority,
+        "category": category,
+        "estimated_time_minutes": minutes,
+        "confidence": (rule_confidence or {}).get(rule, RULE_PRIOR_CONFIDENCE),
+        "rule": rule
+    }
+
+
+def calibrate_rules(rows: Iterable[Tuple[str, str, str]]) -> Dict[str, float]:
+    """
+    Measure each rule's confidence from (title, priority, category) rows labelled by the AI:
+    the Laplace-smoothed share of matching tasks where the rule gives the same priority and
+    category. Rules with fewer than RULE_MIN_MATCHES matches are left out and keep the prior.
+    """
+    matches: Counter = Counter()
+    agreements: Counter = Counter()
+    for title, priority, category in rows:
+        result = classify_with_rules(title)
+        if result is None:
+            continue
+        matches[result["rule"]] += 1
+        if result["priority"] == priority and result["category"] == category:
+            agreements[result["rule"]] += 1
+    return {
+        rule: round((agreements[rule] + 1) / (count + 2), 4)
+        for rule, count in matches.items()
+        if count >= RULE_MIN_MATCHES
+    }
+
+
+def calibrate_confidence(predictions: Iterable[Tuple[float, bool]]) -> List[Tuple[float, float]]:
+    """
+    Map raw posteriors to measured precision from held-out (posterior, correct) predictions.
+
+    Returns (edge, confidence) pairs: the Laplace-smoothed share of predictions with a
+    posterior of at least the edge that were correct. Edges with fewer than
+    RULE_MIN_MATCHES predictions are left out.
+    """
+    predictions = list(predictions)
+    calibration = []
+    for edge in CONFIDENCE_EDGES:
+        outcomes = [correct for posterior, correct in predictions if posterior >= edge]
+        if len(outcomes) >= RULE_MIN_MATCHES:
+            calibration.append((edge, round((sum(outcomes) + 1) / (len(outcomes) + 2), 4)))
+    return calibration
+
+
+def calibrated_confidence(calibration: List[Tuple[float, float]], posterior: float) -> float:
+    """Measured precision for a raw posterior, 0 below the calibrated edges"""
+    confidence = 0.0
+    for edge, measured in calibration:
+        if posterior >= edge:
+            confidence = measured
+    return confidence
+
+
+class NaiveBayes:
+    """
+    Multinomial naive Bayes text classifier with Laplace smoothing
+    """
+
+    def __init__(self):
+        self.class_counts: Dict[str, int] = {}
+        self.token_counts: Dict[str, Dict[str, int]] = {}
+        self.total_tokens: Dict[str, int] = {}
+        self.vocabulary_size = 0
+
+    def fit(self, documents: List[List[str]], labels: List[str]):
+        class_counts = Counter(labels)
+        token_counts: Dict[str, Counter] = defaultdict(Counter)
+        vocabulary = set()
+        for tokens, label in zip(documents, labels):
+            token_counts[label].update(tokens)
+            vocabulary.update(tokens)
+
+        self.class_counts = dict(class_counts)
+        self.token_counts = {label: dict(counts) for label, counts in token_counts.items()}
+        self.total_tokens = {label: sum(counts.values()) for label, counts in token_counts.items()}
+        self.vocabulary_size = len(vocabulary)
+
+    def predict(self, tokens: List[str]) -> Tuple[Optional[str], float]:
+        """Return the most likely label and its posterior probability"""
+        if not self.class_counts:
+            return None, 0.0
+
+        total_documents = sum(self.class_counts.values())
+        log_scores = {}
+        for label, count in self.class_counts.items():
+            score = math.log(count / total_documents)
+            label_tokens = self.token_counts.get(label, {})
+            denominator = self.total_tokens.get(label, 0) + self.vocabulary_size + 1
+            for token in tokens:
+                score += math.log((label_tokens.get(token, 0) + 1) / denominator)
+            log_scores[label] = score
+
+        best_score = max(log_scores.values())
+        normalizer = sum(math.exp(score - best_score) for score in log_scores.values())
+        best_label = max(log_scores, key=log_scores.get)
+        return best_label, 1.0 / normalizer
+
+    def to_dict(self) -> Dict:
+        return {
+            "class_counts": self.class_counts,
+            "token_counts": self.token_counts,
+            "total_tokens": self.total_tokens,
+            "vocabulary_size": self.vocabulary_size
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "NaiveBayes":
+        model = cls()
+        model.class_counts = data["class_counts"]
+        model.token_counts = data["token_counts"]
+        model.total_tokens = data["total_tokens"]
+        model.vocabulary_size = data["vocabulary_size"]
+        return model
+
+
+class LocalClassifier:
+    """
+    Zero-latency classifier tier answering before the AI provider.
+
+    Keyword rules handle trivially classifiable tasks and naive Bayes models
+    trained on tasks previously classified by the AI handle the rest. Both answer
+    with their agreement with the AI measured at training time, and a result is
+    only returned when it reaches the configured threshold.
+    """
+
+    def __init__(self, model_path: str, threshold: float, min_samples: int):
+        self.model_path = model_path
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.priority_model: Optional[NaiveBayes] = None
+        self.category_model: Optional[NaiveBayes] = None
+        self.category_minutes: Dict[str, int] = {}
+        self.rule_confidence: Dict[str, float] = {}
+        self.model_calibration: List[Tuple[float, float]] = []
+        self.trained_samples = 0
+        self._loaded = False
+        self._model_mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self.answered = 0
+        self.escalated = 0
+
+    def classify(self, task_title: str, task_description: str) -> Optional[Dict]:
+        """
+        Return a classification if the local tier is confident enough, otherwise None
+        """
+        self._ensure_loaded()
+
+        result = classify_with_rules(task_title, self.rule_confidence)
+        if result is None and self.category_model is not None:
+            tokens = tokenize(f"{task_title} {task_description}")
+            category, priority, posterior = self._predict(tokens)
+            if category is not None and priority is not None:
+                result = {
+                    "priority": priority,
+                    "category": category,
+                    "estimated_time_minutes": self.category_minutes.get(category, 30),
+                    "confidence": calibrated_confidence(self.model_calibration, posterior)
+                }
+
+        if result is None or result["confidence"] < self.threshold:
+            self.escalated += 1
+            return None
+
+        self.answered += 1
+        return {
+            "priority": result["priority"],
+            "category": result["category"],
+            "estimated_time_minutes": result["estimated_time_minutes"],
+            "subtasks": None,
+            "used_fallback": False,
+            "confidence": round(result["confidence"], 4)
+        }
+
+    def _predict(self, tokens: List[str]) -> Tuple[Optional[str], Optional[str], float]:
+        """Category, priority and the lower of their raw posteriors"""
+        category, category_posterior = self.category_model.predict(tokens)
+        priority, priority_posterior = self.priority_model.predict(tokens)
+        return category, priority, min(category_posterior, priority_posterior)
+
+    def _fit(self, documents: List[List[str]], priorities: List[str], categories: List[str]):
+        self.priority_model = NaiveBayes()
+        self.priority_model.fit(documents, priorities)
+        self.category_model = NaiveBayes()
+        self.category_model.fit(documents, categories)
+
+    def _calibrate_models(self, documents: List[List[str]], priorities: List[str], categories: List[str]):
+        """Measure the models' precision on held-out tasks, using models fitted on the rest"""
+        held_out = [index for index in range(len(documents)) if index % HOLDOUT_EVERY == 0]
+        fitted = [index for index in range(len(documents)) if index % HOLDOUT_EVERY != 0]
+        self._fit([documents[i] for i in fitted], [priorities[i] for i in fitted], [categories[i] for i in fitted])
+        predictions = []
+        for index in held_out:
+            category, priority, posterior = self._predict(documents[index])
+            predictions.append((posterior, category == categories[index] and priority == priorities[index]))
+        self.model_calibration = calibrate_confidence(predictions)
+
+    def train(self, rows: Iterable[Tuple[str, str, str, str, Optional[int]]]) -> int:
+        """
+        Train from (title, description, priority, category, estimated_time_minutes) rows.
+        Returns the number of samples used.
+        """
+        documents, priorities, categories, titles = [], [], [], []
+        minutes_by_category: Dict[str, List[int]] = defaultdict(list)
+        for title, description, priority, category, minutes in rows:
+            titles.append(title)
+            documents.append(tokenize(f"{title} {description or ''}"))
+            priorities.append(priority)
+            categories.append(category)
+            if minutes:
+                minutes_by_category[category].append(minutes)
+
+        if len(documents) < self.min_samples:
+            logger.warning(f"Only {len(documents)} classified tasks available, "
+                           f"at least {self.min_samples} are needed to train the local classifier")
+            self.priority_model = None
+            self.category_model = None
+            self.trained_samples = 0
+            return 0
+
+        self._calibrate_models(documents, priorities, categories)
+        self._fit(documents, priorities, categories)
+        self.category_minutes = {
+            category: int(statistics.median(values)) for category, values in minutes_by_category.items()
+        }
+        self.rule_confidence = calibrate_rules(zip(titles, priorities, categories))
+        self.trained_samples = len(documents)
+        self._loaded = True
+        logger.info(f"Local classifier trained on {self.trained_samples} tasks")
+        return self.trained_samples
+
+    def retrain_from_db(self) -> int:
+        """
+        Retrain from tasks classified by the AI provider and save the model
+        """
+        from sqlalchemy import or_, select
+        from models.database import get_session_local
+        from models.task import Task
+
+        db = get_session_local()()
+        try:
+            rows = db.execute(
+                select(Task.title, Task.description, Task.priority, Task.category, Task.estimated_time_minutes)
+                .where(Task.ai_processed.is_(True))
+                # Never learn from the local tier's own answers
+                .where(or_(Task.classification_tier.is_(None), Task.classification_tier != "local"))
+            ).all()
+        finally:
+            db.close()
+
+        samples = self.train(
+            (title, description, priority.value, category.value, minutes)
+            for title, description, priority, category, minutes in rows
+        )
+        if samples:
+            self.save()
+        return samples
+
+    def save(self):
+        data = {
+            "priority_model": self.priority_model.to_dict(),
+            "category_model": self.category_model.to_dict(),
+            "category_minutes": self.category_minutes,
+            "rule_confidence": self.rule_confidence,
+            "model_calibration": self.model_calibration,
+            "trained_samples": self.trained_samples
+        }
+        # Written to a temporary file and renamed, so other processes never load a partial model
+        temporary_path = f"{self.model_path}.tmp"
+        with open(temporary_path, "w") as model_file:
+            json.dump(data, model_file)
+        os.replace(temporary_path, self.model_path)
+        self._model_mtime = os.stat(self.model_path).st_mtime_ns
+        logger.info(f"Local classifier model saved to {self.model_path}")
+
+    def _ensure_loaded(self):
+        """Load the saved model, again whenever another process saved a retrained one"""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < MODEL_CHECK_INTERVAL:
+            return
+        self._loaded = True
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.model_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._model_mtime:
+            return
+        self._model_mtime = mtime
+        try:
+            with open(self.model_path) as model_file:
+                data = json.load(model_file)
+            self.priority_model = NaiveBayes.from_dict(data["priority_model"])
+            self.category_model = NaiveBayes.from_dict(data["category_model"])
+            self.category_minutes = data["category_minutes"]
+            self.rule_confidence = data.get("rule_confidence", {})
+            # Models saved before calibration never answer on their own
+            self.model_calibration = [tuple(point) for point in data.get("model_calibration", [])]
+            self.trained_samples = data["trained_samples"]
+            logger.info(f"Loaded local classifier model trained on {self.trained_samples} tasks")
+        except Exception as e:
+            logger.error(f"Could not load local classifier model from {self.model_path}: {str(e)}")
+
+    def stats(self) -> Dict:
+        self._ensure_loaded()
+        return {
+            "threshold": self.threshold,
+            "model_trained": self.category_model is not None,
+            "trained_samples": self.trained_samples,
+            "rule_confidence": self.rule_confidence,
+            "model_calibration": self.model_calibration,
+            "answered": self.answered,
+            "escalated": self.escalated
+        }
+
+
+local_classifier = LocalClassifier(
+    model_path=settings.local_classifier_model_path,
+    threshold=settings.local_classifier_threshold,
+    min_samples=settings.local_classifier_min_samples
+)
+
+
+if __name__ == "__main__":
+    # Usage: python -m utils.local_classifier retrain
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] != ["retrain"]:
+        print("Usage: python -m utils.local_classifier retrain")
+        sys.exit(1)
+    trained = local_classifier.retrain_from_db()
+    print(f"Local classifier trained on {trained} tasks")
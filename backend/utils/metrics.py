@@ -0,0 +1,207 @@
+import time
+from typing import Dict, List
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+# Latency buckets in seconds: database queries are milliseconds, LLM calls are seconds
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent, per route template",
+    ["method", "route", "status"],
+    buckets=FAST_BUCKETS + (10.0, 30.0, 60.0)
+)
+
+CLASSIFICATIONS = Counter(
+    "task_classifications_total",
+    "Task classifications by the tier that answered (cache, local, llm, fallback)",
+    ["tier"]
+)
+
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds",
+    "Duration of single AI provider calls",
+    ["provider", "model", "outcome"],
+    buckets=LLM_BUCKETS
+)
+
+LLM_CLASSIFICATION_ATTEMPTS = Histogram(
+    "llm_classification_attempts",
+    "Provider calls made for one classification, including retries",
+    ["provider", "model"],
+    buckets=(1, 2, 3, 4, 5, 7, 10)
+)
+
+LLM_CLASSIFICATION_RESULTS = Counter(
+    "llm_classification_results_total",
+    "Classifications sent to the AI provider by result (success, fallback, circuit_open)",
+    ["provider", "model", "result"]
+)
+
+LLM_RESPONSE_FAILURES = Counter(
+    "llm_response_failures_total",
+    "AI provider responses that could not be used (empty, yaml_parse, json_parse, validation)",
+    ["provider", "model", "reason"]
+)
+
+LLM_RESPONSE_COERCIONS = Counter(
+    "llm_response_coercions_total",
+    "AI provider responses accepted after lenient coercion (e.g. \"60 minutes\" or \"high\")",
+    ["provider", "model"]
+)
+
+LLM_STREAM_EARLY_STOPS = Counter(
+    "llm_stream_early_stops_total",
+    "Streamed classifications closed as soon as all fields were received",
+    ["provider", "model"]
+)
+
+LLM_ROUTED_CLASSIFICATIONS = Counter(
+    "llm_routed_classifications_total",
+    "Classifications answered by each provider backend of the router",
+    ["provider", "model"]
+)
+
+LLM_HEDGED_REQUESTS = Counter(
+    "llm_hedged_requests_total",
+    "Classifications that sent a hedged second request, by which request answered first (primary, hedge, none)",
+    ["result"]
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens billed by the AI provider, by kind (prompt, completion); counted locally where the provider didn't report usage",
+    ["provider", "model", "kind"]
+)
+
+LLM_CALL_TOKENS = Histogram(
+    "llm_call_tokens",
+    "Tokens of single AI provider calls, by kind (prompt, completion)",
+    ["provider", "model", "kind"],
+    buckets=(25, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 4000, 8000)
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time",
+    ["engine", "statement"],
+    buckets=FAST_BUCKETS
+)
+
+
+def record_classification(result: Dict):
+    CLASSIFICATIONS.labels(tier=result.get("tier") or "unknown").inc()
+
+
+def record_token_usage(provider: str, model: str, prompt_tokens: int, completion_tokens: int):
+    for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+        LLM_TOKENS.labels(provider=provider, model=model, kind=kind).inc(tokens)
+        LLM_CALL_TOKENS.labels(provider=provider, model=model, kind=kind).observe(tokens)
+
+
+def _statement_type(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def instrument_engine(engine, name: str):
+    """
+    Time every statement executed on a (sync) engine and report its pool usage on scrape.
+
+    Pass async_engine.sync_engine for an async engine.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started_at"].pop()
+        DB_QUERY_DURATION.labels(engine=name, statement=_statement_type(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # Failed statements never reach after_cursor_execute
+        started = context.connection.info.get("query_started_at") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    _pool_collector.engines[name] = engine
+
+
+class PoolCollector:
+    """Reports checked out, idle and overflow connections of each instrumented engine's pool"""
+
+    def __init__(self):
+        self.engines: Dict[str, object] = {}
+
+    def collect(self) -> List[GaugeMetricFamily]:
+        size = GaugeMetricFamily("db_pool_size", "Configured connection pool size", labels=["engine"])
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections currently in use", labels=["engine"])
+        checked_in = GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections opened beyond the pool size", labels=["engine"])
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            checked_in.add_metric([name], pool.checkedin())
+            overflow.add_metric([name], max(0, pool.overflow()))
+        return [size, checked_out, checked_in, overflow]
+
+
+_pool_collector = PoolCollector()
+REGISTRY.register(_pool_collector)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template.
+
+    Latency is measured until the response headers are sent, so long-lived
+    event streams count their setup time rather than their lifetime.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status):
+            nonlocal recorded
+            recorded = True
+            # The router stores the matched route in the scope; the template keeps label cardinality bounded
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status)
+            ).observe(time.perf_counter() - started)
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start" and not recorded:
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            if not recorded:
+                record(500)
+            raise
+
+
+def metrics_payload():
+    """Current metrics in the Prometheus text format, with its content type"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,123 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, select, tuple_, union_all
+
+from models.task import Task, PriorityEnum
+
+# Sort options for task listings: name -> description of the keyset
+SORT_OPTIONS = {
+    "newest": "created_at descending",
+    "oldest": "created_at ascending",
+    "priority": "priority (High first), then newest",
+}
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _encode_payload(payload: dict) -> str:
+    data = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_payload(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+
+def encode_cursor(sort: str, task: Task) -> str:
+    """
+    Encode the position after the given task as an opaque cursor string
+    """
+    values = [task.created_at.isoformat(), task.id]
+    if sort == "priority":
+        values.insert(0, task.priority.name)
+    return _encode_payload({"sort": sort, "values": values})
+
+
+def decode_cursor(sort: str, cursor: str) -> List:
+    """
+    Decode a cursor produced by encode_cursor for the same sort order
+    """
+    try:
+        payload = _decode_payload(cursor)
+        if payload["sort"] != sort:
+            raise InvalidCursorError("Cursor was created for a different sort order")
+        values = payload["values"]
+        if sort == "priority":
+            return [PriorityEnum[values[0]], datetime.fromisoformat(values[1]), int(values[2])]
+        return [datetime.fromisoformat(values[0]), int(values[1])]
+    except InvalidCursorError:
+        raise
+    except Exception:
+        raise InvalidCursorError("Invalid cursor")
+
+
+def keyset_order(sort: str) -> list:
+    """
+    Return the ORDER BY clauses of a sort order
+    """
+    if sort == "oldest":
+        return [Task.created_at.asc(), Task.id.asc()]
+    if sort == "priority":
+        # Postgres orders enum values by declaration order, so ascending means High first
+        return [Task.priority.asc(), Task.created_at.desc(), Task.id.desc()]
+    return [Task.created_at.desc(), Task.id.desc()]
+
+
+def keyset_page(query: Select, sort: str, cursor_values: Optional[List], limit: int) -> Select:
+    """
+    Return the query sorted, limited and seeking past the cursor.
+
+    Cursors are compared as rows, e.g. (created_at, id) < (c, i), which Postgres uses
+    as the start of an index range scan, so deep pages cost no more than the first.
+    """
+    order_by = keyset_order(sort)
+    if not cursor_values:
+        return query.order_by(*order_by).limit(limit)
+
+    if sort == "oldest":
+        created_at, task_id = cursor_values
+        return query.where(tuple_(Task.created_at, Task.id) > tuple_(created_at, task_id)).order_by(*order_by).limit(limit)
+
+    if sort == "priority":
+        # Priority ascends while the rest descends, which no single row comparison covers.
+        # The rest of the cursor's priority and the lower priorities are two ranges of
+        # ix_tasks_user_priority_created_id, each read for at most one page.
+        priority, created_at, task_id = cursor_values
+        same_priority = query.where(
+            Task.priority == priority, tuple_(Task.created_at, Task.id) < tuple_(created_at, task_id)
+        ).order_by(*order_by).limit(limit)
+        lower_priority = query.where(Task.priority > priority).order_by(*order_by).limit(limit)
+        page = union_all(same_priority, lower_priority).subquery()
+        return select(page).order_by(page.c.priority.asc(), page.c.created_at.desc(), page.c.id.desc()).limit(limit)
+
+    created_at, task_id = cursor_values
+    return query.where(tuple_(Task.created_at, Task.id) < tuple_(created_at, task_id)).order_by(*order_by).limit(limit)
+
+
+def encode_change_cursor(change_version: int, task_id: int) -> str:
+    """
+    Encode a position in a user's change feed as an opaque cursor string
+    """
+    return _encode_payload({"sort": "changes", "values": [change_version, task_id]})
+
+
+def decode_change_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Decode a cursor produced by encode_change_cursor into (change_version, task_id)
+    """
+    try:
+        payload = _decode_payload(cursor)
+        if payload["sort"] != "changes":
+            raise InvalidCursorError("Cursor was not created by the changes feed")
+        change_version, task_id = payload["values"]
+        return int(change_version), int(task_id)
+    except InvalidCursorError:
+        raise
+    except Exception:
+        raise InvalidCursorError("Invalid cursor")
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Version of the classification prompt, part of the cache key.
+# Bump it whenever the prompt or response parsing changes so stale cached results are not reused.
+PROMPT_VERSION = "2"
+
+# Rough token count when no tokenizer is available: a word, or a run of punctuation
+APPROXIMATE_TOKEN = re.compile(r"\w+|[^\w\s]+")
+WHITESPACE = re.compile(r"\s+")
+TRUNCATION_MARKER = " [...] "
+
+# Instructions come first and the task last, so the fixed part of the prompt is a
+# shared prefix that providers with prompt caching can reuse between calls
+SYSTEM_PROMPT = "You are an expert task classifier. Respond only with valid {output_format}."
+
+FIELDS_YAML = """priority: High|Medium|Low
+category: Work|Personal|Learning|Health|Other
+estimated_time_minutes: <integer>
+subtasks: list of short steps, or null"""
+
+SINGLE_TASK_YAML = "Classify the task. Reply with only these YAML fields:\n" + FIELDS_YAML
+SINGLE_TASK_JSON = ("Classify the task. Reply with a JSON object with priority (High, Medium or Low), "
+                    "category (Work, Personal, Learning, Health or Other), estimated_time_minutes (integer) "
+                    "and subtasks (list of short steps, or null).")
+BATCH_YAML = ("Classify each task. Reply with only a YAML list, one entry per task, each with "
+              "index (the task number) and these fields:\n" + FIELDS_YAML)
+
+
+# Encoding loaded by load_tokenizer(); token counts are estimated until then
+_tokenizer = None
+
+
+async def load_tokenizer(timeout: float = 30.0):
+    """
+    Load the configured tiktoken encoding in a worker thread, keeping the estimate on failure.
+
+    tiktoken downloads the encoding file on first use (without a timeout) unless it is
+    already in TIKTOKEN_CACHE_DIR, so this never runs on the request path.
+    """
+    global _tokenizer
+    name = settings.llm_tokenizer
+    if tiktoken is None or not name:
+        return
+    try:
+        _tokenizer = await asyncio.wait_for(asyncio.to_thread(tiktoken.get_encoding, name), timeout=timeout)
+        logger.info(f"Loaded tokenizer '{name}'")
+    except Exception as e:
+        logger.warning(f"Tokenizer '{name}' unavailable ({str(e) or type(e).__name__}), estimating token counts")
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in the text with the configured local tokenizer, or an estimate without one"""
+    if not text:
+        return 0
+    encoding = _tokenizer
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(APPROXIMATE_TOKEN.findall(text))
+
+
+def count_message_tokens(messages: List[Dict]) -> int:
+    # Chat formats add a few tokens per message around the content
+    return sum(count_tokens(str(message.get("content") or "")) + 4 for message in messages)
+
+
+def _split_tokens(text: str, head_budget: int, tail_budget: int) -> Tuple[str, str]:
+    """The text of the first head_budget and the last tail_budget tokens"""
+    encoding = _tokenizer
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return encoding.decode(tokens[:head_budget]), encoding.decode(tokens[len(tokens) - tail_budget:])
+    matches = list(APPROXIMATE_TOKEN.finditer(text))
+    return text[:matches[head_budget - 1].end()], text[matches[-tail_budget].start():] if tail_budget else ""
+
+
+def truncate_to_budget(text: Optional[str], budget: int) -> Tuple[str, bool]:
+    """
+    Fit the text into a token budget, returning it with whether it was shortened.
+
+    Whitespace runs are collapsed first. Text still over the budget keeps its
+    beginning (where descriptions usually state the task) and its last part
+    (often the deadline or the expected result), joined by a [...] marker.
+    A budget of 0 leaves the text as it is.
+    """
+    text = WHITESPACE.sub(" ", text or "").strip()
+    if budget <= 0 or count_tokens(text) <= budget:
+        return text, False
+
+    budget = max(1, budget - count_tokens(TRUNCATION_MARKER))
+    head_budget = max(1, budget * 3 // 4)
+    head, tail = _split_tokens(text, head_budget, budget - head_budget)
+    # Don't cut words in half
+    head = head.rsplit(" ", 1)[0] if " " in head else head
+    tail = tail.split(" ", 1)[1] if " " in tail.strip() else tail
+    return (head.strip() + TRUNCATION_MARKER + tail.strip()).strip(), True
+
+
+def _task_text(title: str, description: Optional[str]) -> Tuple[str, bool]:
+    title, title_truncated = truncate_to_budget(title, settings.llm_title_token_budget)
+    description, description_truncated = truncate_to_budget(description, settings.llm_description_token_budget)
+    return f"Task Title: {title}\nTask Description: {description or '-'}", title_truncated or description_truncated
+
+
+def build_single_task_messages(task_title: str, task_description: Optional[str], structured: bool) -> List[Dict]:
+    """
+    Chat messages classifying one task, asking for YAML, or for JSON when the provider enforces structured output
+    """
+    task, truncated = _task_text(task_title, task_description)
+    if truncated:
+        logger.info(f"Shortened task text to the prompt token budget for '{task_title[:50]}'")
+    instructions = SINGLE_TASK_JSON if structured else SINGLE_TASK_YAML
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT.format(output_format="JSON" if structured else "YAML")},
+        {"role": "user", "content": f"{instructions}\n\n{task}"}
+    ]
+
+
+def build_batch_messages(tasks: List[Tuple[str, Optional[str]]]) -> List[Dict]:
+    """Chat messages classifying several tasks in one YAML answer"""
+    task_blocks = []
+    truncated = 0
+    for number, (title, description) in enumerate(tasks, start=1):
+        task, was_truncated = _task_text(title, description)
+        truncated += was_truncated
+        task_blocks.append(f"{number}. {task}")
+    if truncated:
+        logger.info(f"Shortened {truncated} of {len(tasks)} batched tasks to the prompt token budget")
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT.format(output_format="YAML")},
+        {"role": "user", "content": BATCH_YAML + "\n\n" + "\n\n".join(task_blocks)}
+    ]
+
+
+def response_usage(response: Any) -> Optional[Dict[str, int]]:
+    """Prompt and completion tokens from a response's (or final stream chunk's) usage field"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens is None and completion_tokens is None:
+        return None
+    return {"prompt_tokens": prompt_tokens or 0, "completion_tokens": completion_tokens or 0}
+
+
+def estimate_usage(messages: List[Dict], completion: Optional[str]) -> Dict[str, int]:
+    """Token usage counted locally, for streams closed before the provider reported it"""
+    return {
+        "prompt_tokens": count_message_tokens(messages),
+        "completion_tokens": count_tokens(completion or ""),
+        "estimated": True
+    }
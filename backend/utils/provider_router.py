@@ -0,0 +1,276 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from .circuit_breaker import CircuitStateEnum, get_circuit_breaker
+from .metrics import LLM_HEDGED_REQUESTS, LLM_ROUTED_CLASSIFICATIONS
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Failures weigh less with time, so a backend that failed gets traffic again once it may have recovered
+ERROR_RATE_HALF_LIFE = 60.0
+
+
+@dataclass(frozen=True)
+class ProviderBackend:
+    provider_url: str
+    model_name: str
+    api_token: str = field(default="", repr=False)  # Kept out of logs and reprs
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.provider_url.rstrip("/"), self.model_name)
+
+    def __str__(self) -> str:
+        return f"{self.provider_url} / {self.model_name}"
+
+
+def parse_backends(value: str) -> List[ProviderBackend]:
+    """
+    Parse backends from a JSON list of {"provider_url", "model_name", "api_token"} objects
+    """
+    if not value or not value.strip():
+        return []
+    entries = json.loads(value)
+    if not isinstance(entries, list):
+        raise ValueError("LLM backends must be a JSON list")
+    backends = []
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("provider_url") or not entry.get("model_name"):
+            raise ValueError("Every LLM backend needs a provider_url and a model_name")
+        backends.append(ProviderBackend(entry["provider_url"], entry["model_name"], entry.get("api_token") or ""))
+    return backends
+
+
+class BackendStats:
+    """Recent classification latencies and error rate of one backend"""
+
+    def __init__(self, window: int, alpha: float = 0.2):
+        self.alpha = alpha
+        self.latencies = deque(maxlen=window)
+        self.latency_ewma: Optional[float] = None
+        self._error_rate = 0.0
+        self._error_rate_at = time.monotonic()
+        self.classifications = 0
+        self.failures = 0
+        self.hedges_won = 0
+
+    def record(self, seconds: Optional[float], success: bool):
+        """Count a classification; seconds is None for calls whose latency isn't comparable (batches)"""
+        self.classifications += 1
+        error_rate = self.error_rate
+        self._error_rate = error_rate + self.alpha * ((0.0 if success else 1.0) - error_rate)
+        self._error_rate_at = time.monotonic()
+        if not success:
+            self.failures += 1
+        elif seconds is not None:
+            self.record_latency(seconds)
+
+    @property
+    def error_rate(self) -> float:
+        return self._error_rate * 0.5 ** ((time.monotonic() - self._error_rate_at) / ERROR_RATE_HALF_LIFE)
+
+    def record_latency(self, seconds: float):
+        self.latencies.append(seconds)
+        self.latency_ewma = seconds if self.latency_ewma is None else self.latency_ewma + self.alpha * (seconds - self.latency_ewma)
+
+    def percentile(self, fraction: float) -> float:
+        """Nearest-rank percentile of the recent latencies"""
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+    def score(self, failure_penalty: float) -> float:
+        """
+        Expected seconds until a usable answer: the typical latency plus the error rate
+        times what a failed classification costs. Backends without samples score 0 so
+        they are tried and measured.
+        """
+        return (self.latency_ewma or 0.0) + self.error_rate * failure_penalty
+
+
+class ProviderRouter:
+    """
+    Spreads classifications over the requested provider and the configured backends.
+
+    Candidates are ordered by observed latency and error rate, backends with an open
+    circuit last. A classification goes to the best candidate and fails over to the
+    next one when it ends in fallback values. With hedging enabled, a second request
+    is sent to the next candidate if the first hasn't answered within its latency
+    percentile; whichever answers first wins and the other request is cancelled.
+    """
+
+    def __init__(self, backends: List[ProviderBackend], hedging: bool, hedge_percentile: float,
+                 hedge_min_delay: float, hedge_initial_delay: float, window: int, min_samples: int,
+                 failure_penalty: float):
+        self.backends = list(backends)
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_initial_delay = hedge_initial_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.failure_penalty = failure_penalty
+        self._stats: Dict[Tuple[str, str], BackendStats] = {}
+        self.hedges = 0
+        self.failovers = 0
+
+    def set_backends(self, backends: List[ProviderBackend]):
+        self.backends = list(backends)
+        logger.info(f"Provider router backends: {', '.join(str(backend) for backend in backends) or 'none'}")
+
+    def _backend_stats(self, backend: ProviderBackend) -> BackendStats:
+        stats = self._stats.get(backend.key)
+        if stats is None:
+            stats = self._stats[backend.key] = BackendStats(self.window)
+        return stats
+
+    def candidates(self, provider_url: str, api_token: str, model_name: str) -> List[ProviderBackend]:
+        """The requested backend and the configured ones, best first"""
+        requested = ProviderBackend(provider_url, model_name, api_token)
+        unique = {requested.key: requested}
+        for backend in self.backends:
+            unique.setdefault(backend.key, backend)
+        listed = list(unique.values())
+
+        def rank(backend: ProviderBackend):
+            circuit_open = get_circuit_breaker(backend.provider_url, backend.model_name).state == CircuitStateEnum.OPEN
+            # Listed order breaks ties, so the requested backend goes first until there are measurements
+            return (circuit_open, self._backend_stats(backend).score(self.failure_penalty), listed.index(backend))
+
+        return sorted(listed, key=rank)
+
+    def hedge_delay(self, backend: ProviderBackend) -> float:
+        """Seconds to wait for a backend before hedging, its latency percentile once it has enough samples"""
+        stats = self._backend_stats(backend)
+        if len(stats.latencies) < self.min_samples:
+            return max(self.hedge_min_delay, self.hedge_initial_delay)
+        return max(self.hedge_min_delay, stats.percentile(self.hedge_percentile))
+
+    async def classify(self, provider_url: str, api_token: str, model_name: str,
+                       call: Callable[[ProviderBackend], Awaitable[Dict]],
+                       batch: bool = False) -> Tuple[Dict, ProviderBackend]:
+        """
+        Run call(backend) on the best candidate, failing over and hedging as configured.
+
+        call returns a classification, with used_fallback False when the provider answered.
+        The first such answer is returned with the backend that gave it; if every candidate
+        falls back, the first fallback that isn't a circuit_open rejection is returned.
+        Batches fail over but are never hedged, a hedge would repeat the whole batch,
+        and their latencies are kept out of the single classification measurements.
+        """
+        remaining = self.candidates(provider_url, api_token, model_name)
+        pending: Dict[asyncio.Task, Tuple[ProviderBackend, float, bool]] = {}
+        fallbacks: List[Tuple[Dict, ProviderBackend]] = []
+        error: Optional[Exception] = None
+        hedge_at: Optional[float] = None
+        hedged = False
+
+        def launch(hedge: bool = False):
+            nonlocal hedge_at, hedged
+            backend = remaining.pop(0)
+            pending[asyncio.ensure_future(call(backend))] = (backend, time.monotonic(), hedge)
+            if not hedge:
+                # The first request and every failover get their own hedge delay
+                if hedged:
+                    LLM_HEDGED_REQUESTS.labels(result="none").inc()
+                hedged = False
+                hedge_at = time.monotonic() + self.hedge_delay(backend) if self.hedging and not batch and remaining else None
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if hedge_at is not None and not hedged and remaining:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    logger.info(f"No answer from {next(iter(pending.values()))[0]} within the hedge delay, "
+                                f"hedging with {remaining[0]}")
+                    launch(hedge=True)
+                    continue
+
+                for task in done:
+                    backend, started, hedge = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"Classification with {backend} failed: {str(e)}")
+                        error = e
+                        result = None
+                    success = result is not None and result.get("used_fallback") is False
+                    if result is None or not result.get("circuit_open"):
+                        self._backend_stats(backend).record(None if batch else time.monotonic() - started, success)
+                    if success:
+                        LLM_ROUTED_CLASSIFICATIONS.labels(provider=backend.provider_url, model=backend.model_name).inc()
+                        if hedged:
+                            LLM_HEDGED_REQUESTS.labels(result="hedge" if hedge else "primary").inc()
+                            if hedge:
+                                self._backend_stats(backend).hedges_won += 1
+                        logger.info(f"Classification answered by {backend}" + (" (hedge)" if hedge else ""))
+                        return result, backend
+                    if result is not None:
+                        fallbacks.append((result, backend))
+
+                if not pending and remaining:
+                    self.failovers += 1
+                    logger.warning(f"Classification fell back, failing over to {remaining[0]}")
+                    launch()
+        finally:
+            for task, (backend, started, _) in pending.items():
+                task.cancel()
+                # A cancelled request took at least this long; keeps slow backends from looking fast forever
+                if not batch:
+                    self._backend_stats(backend).record_latency(time.monotonic() - started)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if hedged:
+            LLM_HEDGED_REQUESTS.labels(result="none").inc()
+        if not fallbacks:
+            raise error
+        return next((fallback for fallback in fallbacks if not fallback[0].get("circuit_open")), fallbacks[0])
+
+    def stats(self) -> Dict:
+        return {
+            "hedging": self.hedging,
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "backends": [
+                {
+                    "provider_url": provider_url,
+                    "model_name": model_name,
+                    "configured": any(backend.key == (provider_url, model_name) for backend in self.backends),
+                    "classifications": stats.classifications,
+                    "failures": stats.failures,
+                    "error_rate": round(stats.error_rate, 3),
+                    "latency_ewma_ms": round(stats.latency_ewma * 1000, 1) if stats.latency_ewma is not None else None,
+                    "latency_p50_ms": round(stats.percentile(0.5) * 1000, 1) if stats.latencies else None,
+                    "latency_p95_ms": round(stats.percentile(0.95) * 1000, 1) if stats.latencies else None,
+                    "hedges_won": stats.hedges_won
+                }
+                for (provider_url, model_name), stats in self._stats.items()
+            ]
+        }
+
+
+provider_router = ProviderRouter(
+    backends=parse_backends(settings.llm_backends),
+    hedging=settings.llm_hedging_enabled,
+    hedge_percentile=settings.llm_hedge_percentile,
+    hedge_min_delay=settings.llm_hedge_min_delay,
+    hedge_initial_delay=settings.llm_hedge_initial_delay,
+    window=settings.llm_router_window,
+    min_samples=settings.llm_router_min_samples,
+    # A failing classification can take up to the retry deadline before falling back
+    failure_penalty=settings.llm_retry_deadline
+)
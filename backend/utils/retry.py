@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+import openai
+
+from config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, bounded by a total deadline per request
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    multiplier: float = 2.0
+    deadline: float = 45.0  # Total seconds budget for all attempts and waits
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before the next attempt, attempt is zero based"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * self.multiplier ** attempt))
+
+
+@dataclass
+class RetryDecision:
+    retryable: bool
+    reason: str
+    status_code: Optional[int] = None
+    retry_after: Optional[float] = None  # Seconds requested by the provider
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """
+    Read the provider's requested wait from Retry-After style headers
+    """
+    if headers is None:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def classify_error(error: Exception) -> RetryDecision:
+    """
+    Decide whether a failed provider call should be retried, based on the error type and status code
+    """
+    if isinstance(error, openai.APITimeoutError):
+        return RetryDecision(retryable=True, reason="timeout")
+    if isinstance(error, openai.APIConnectionError):
+        return RetryDecision(retryable=True, reason="connection")
+    if isinstance(error, openai.APIStatusError):
+        status_code = error.status_code
+        retry_after = parse_retry_after(error.response.headers)
+        if status_code == 429:
+            reason = "rate_limited"
+        elif status_code in (401, 403):
+            reason = "authentication"
+        elif status_code >= 500:
+            reason = "server_error"
+        else:
+            reason = f"http_{status_code}"
+        return RetryDecision(
+            retryable=status_code in RETRYABLE_STATUS_CODES,
+            reason=reason,
+            status_code=status_code,
+            retry_after=retry_after
+        )
+    # Raised as they are, without the openai wrappers, while a stream is being read
+    if isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError)):
+        return RetryDecision(retryable=True, reason="timeout")
+    if isinstance(error, httpx.TransportError):
+        return RetryDecision(retryable=True, reason="connection")
+    return RetryDecision(retryable=False, reason=type(error).__name__)
+
+
+class TokenBucket:
+    """
+    Async token bucket limiting the request rate to a provider.
+
+    A Retry-After from the provider pauses the whole bucket, so all concurrent
+    requests back off together instead of each running into its own 429.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.throttled = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for the given number of seconds"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a token. Returns False if it can't be obtained within the timeout.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if self.enabled:
+                    self._refill(now)
+                if now >= self._paused_until and (not self.enabled or self._tokens >= 1):
+                    if self.enabled:
+                        self._tokens -= 1
+                    return True
+
+                wait = self._paused_until - now
+                if self.enabled:
+                    wait = max(wait, (1 - self._tokens) / self.rate)
+                if deadline is not None and now + wait > deadline:
+                    return False
+                self.throttled += 1
+                await asyncio.sleep(wait)
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "rate_per_second": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(min(self.capacity, self._tokens + (now - self._updated_at) * self.rate), 2) if self.enabled else None,
+            "paused_for_seconds": round(max(0.0, self._paused_until - now), 2),
+            "throttled": self.throttled
+        }
+
+
+# One rate limiter per provider URL, shared by all requests in this process
+_rate_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(provider_url: str) -> TokenBucket:
+    limiter = _rate_limiters.get(provider_url)
+    if limiter is None:
+        limiter = TokenBucket(settings.llm_rate_limit_per_second, settings.llm_rate_limit_burst)
+        _rate_limiters[provider_url] = limiter
+    return limiter
+
+
+def rate_limiter_stats() -> Dict:
+    return {provider_url: limiter.stats() for provider_url, limiter in _rate_limiters.items()}
+
+
+default_retry_policy = RetryPolicy(
+    max_attempts=settings.llm_retry_max_attempts,
+    base_delay=settings.llm_retry_base_delay,
+    max_delay=settings.llm_retry_max_delay,
+    deadline=settings.llm_retry_deadline
+)
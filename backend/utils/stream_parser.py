@@ -0,0 +1,102 @@
+import re
+from typing import List, Optional, Set
+
+from .structured_output import normalize_key
+
+# Top-level fields of a single-task classification answer
+CLASSIFICATION_FIELDS = ("priority", "category", "estimated_time_minutes", "subtasks")
+
+# Keys may be capitalized or spaced ("Priority", "Estimated time"), they are normalized before matching
+TOP_LEVEL_KEY = re.compile(r"^([A-Za-z_][A-Za-z0-9_ \-]*):(.*)$")
+
+
+class ClassificationStreamParser:
+    """
+    Incrementally collects the YAML document of a classification answer.
+
+    Feed it the completion text chunk by chunk as it streams in; `complete`
+    turns true as soon as every classification field has been read in full,
+    so the caller can stop reading. A block value (the subtasks list) counts
+    as finished once a line follows that doesn't belong to it, e.g. the
+    closing code fence or the model's explanation. Text before the YAML and
+    after the document is left out of `document()`. Keys are compared after
+    normalization, so "Priority:" or an alias like "estimate:" count as fields.
+    """
+
+    def __init__(self, fields=CLASSIFICATION_FIELDS):
+        self.fields = set(fields)
+        self.complete = False
+        self._partial = ""
+        self._lines: List[str] = []
+        self._seen: Set[str] = set()
+        self._started = False
+        self._open_block: Optional[str] = None
+        self._finished = False
+
+    def feed(self, text: Optional[str]) -> bool:
+        """Add streamed text, returning True once the document is complete"""
+        if not text or self._finished:
+            return self.complete
+        self._partial += text
+        *lines, self._partial = self._partial.split("\n")
+        for line in lines:
+            self._add_line(line.rstrip("\r"))
+            if self._finished:
+                break
+        return self.complete
+
+    def close(self):
+        """Mark the end of the stream, taking any unterminated last line into account"""
+        if not self._finished and self._partial:
+            self._add_line(self._partial)
+        self._partial = ""
+        self._finished = True
+
+    def document(self) -> str:
+        return "\n".join(self._lines).strip()
+
+    def _add_line(self, line: str):
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if self._started:
+                # Closing fence ends the document
+                self._finish()
+            return
+
+        match = TOP_LEVEL_KEY.match(line)
+        if not self._started:
+            if match is None or normalize_key(match.group(1)) not in self.fields:
+                return  # Preamble before the YAML, e.g. "Here is the classification:"
+            self._started = True
+
+        if not stripped:
+            self._lines.append(line)
+            return
+
+        top_level = not line[0].isspace()
+        if top_level and match is not None and " " in match.group(1).strip() and normalize_key(match.group(1)) not in self.fields:
+            # A sentence ending in a colon, e.g. "This estimate assumes:", not a key
+            self._finish()
+            return
+        if top_level and match is not None:
+            key, value = normalize_key(match.group(1)), match.group(2).strip()
+            self._open_block = None if value else key
+            self._seen.add(key)
+        elif top_level and not stripped.startswith("-"):
+            # Text that is neither a key nor a list item: the model is explaining its answer
+            self._finish()
+            return
+        elif self._open_block is None and top_level:
+            self._finish()
+            return
+
+        self._lines.append(line)
+        if self._open_block is None and self.fields <= self._seen:
+            self.complete = True
+            self._finished = True
+
+    def _finish(self):
+        self._finished = True
+        self._open_block = None
+        if self.fields <= self._seen:
+            self.complete = True
@@ -0,0 +1,205 @@
+import json
+import logging
+import re
+from typing import Any, Dict, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("High", "Medium", "Low")
+CATEGORIES = ("Work", "Personal", "Learning", "Health", "Other")
+
+# Ways of asking the provider for a classification: free-form YAML, or JSON
+# enforced by the provider (a JSON schema, or plain JSON mode where schemas aren't supported)
+RESPONSE_FORMATS = ("yaml", "json_schema", "json_object")
+
+CLASSIFICATION_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "priority": {"type": "string", "enum": list(PRIORITIES)},
+        "category": {"type": "string", "enum": list(CATEGORIES)},
+        "estimated_time_minutes": {"type": "integer", "minimum": 1},
+        "subtasks": {"type": ["array", "null"], "items": {"type": "string"}}
+    },
+    "required": ["priority", "category", "estimated_time_minutes", "subtasks"],
+    "additionalProperties": False
+}
+
+# Other names models use for the classification fields
+FIELD_ALIASES = {
+    "estimated_time": "estimated_time_minutes",
+    "estimated_minutes": "estimated_time_minutes",
+    "estimate": "estimated_time_minutes",
+    "time_estimate": "estimated_time_minutes",
+    "estimated_duration": "estimated_time_minutes",
+    "steps": "subtasks",
+    "sub_tasks": "subtasks"
+}
+
+MINUTE_UNITS = ("", "m", "min", "mins", "minute", "minutes")
+HOUR_UNITS = ("h", "hr", "hrs", "hour", "hours")
+DURATION_PART = re.compile(r"(\d+(?:[.,]\d+)?)\s*([a-z]*)", re.IGNORECASE)
+DURATION_RANGE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:-|–|to)\s*(\d+(?:[.,]\d+)?)\s*([a-z]*)", re.IGNORECASE)
+
+# (provider_url, model_name) pairs that rejected response_format, asked in YAML from then on
+_unsupported: Set[Tuple[str, str]] = set()
+
+
+def response_format_for(mode: str, provider_url: str, model_name: str) -> Optional[Dict]:
+    """
+    The response_format request parameter for the mode, or None to ask for YAML
+    """
+    if mode == "yaml" or (provider_url, model_name) in _unsupported:
+        return None
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "task_classification", "strict": True, "schema": CLASSIFICATION_JSON_SCHEMA}
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    raise ValueError(f"Unknown response format '{mode}', expected one of {', '.join(RESPONSE_FORMATS)}")
+
+
+def mark_unsupported(provider_url: str, model_name: str):
+    """Remember that a provider/model rejected structured output so it is asked for YAML instead"""
+    if (provider_url, model_name) not in _unsupported:
+        logger.warning(f"{provider_url} / {model_name} does not support structured output, using YAML responses")
+        _unsupported.add((provider_url, model_name))
+
+
+def is_response_format_error(error: Exception) -> bool:
+    """
+    Whether a 400 from the provider rejects the response_format parameter, rather than
+    e.g. the prompt length or the model name
+    """
+    if getattr(error, "param", None) == "response_format":
+        return True
+    message = str(getattr(error, "message", None) or error).lower()
+    return any(hint in message for hint in ("response_format", "response format", "json_schema", "json mode", "structured output"))
+
+
+def loads_json(content: str) -> Any:
+    """Parse JSON with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def normalize_key(key: Any) -> str:
+    """The classification field a key stands for, e.g. "Priority" or "estimate" -> estimated_time_minutes"""
+    key = re.sub(r"[\s\-]+", "_", str(key).strip().lower())
+    return FIELD_ALIASES.get(key, key)
+
+
+def _match_choice(value: Any, choices: Tuple[str, ...]) -> Any:
+    if not isinstance(value, str):
+        return value
+    text = value.strip().strip("\"'.").lower()
+    for choice in choices:
+        if text == choice.lower():
+            return choice
+    return value
+
+
+def _to_number(text: str) -> float:
+    return float(text.replace(",", "."))
+
+
+def _minutes(amount: float, unit: str) -> Optional[float]:
+    unit = unit.lower()
+    if unit in HOUR_UNITS:
+        return amount * 60
+    if unit in MINUTE_UNITS:
+        return amount
+    return None
+
+
+def coerce_minutes(value: Any) -> Any:
+    """
+    Turn estimates like "60", "60 minutes", "1.5 hours", "1h 30m" or "30-45 min"
+    into whole minutes, leaving anything unrecognizable unchanged.
+    Only the first duration counts, so "90 min (1.5 h)" is 90 minutes.
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float):
+        return round(value) if value > 0 else value
+    if not isinstance(value, str):
+        return value
+
+    text = value.strip()
+    first = DURATION_PART.search(text)
+    if first is None:
+        return value
+    range_match = DURATION_RANGE.match(text, first.start())
+    if range_match:
+        low, high, unit = range_match.groups()
+        parts = [_minutes((_to_number(low) + _to_number(high)) / 2, unit)]
+    else:
+        # Parts separated by nothing but spaces, commas or "and" ("1h 30m") make up one
+        # duration; any other text ends it, and later numbers restate or explain it
+        parts = []
+        end = first.start()
+        for part in DURATION_PART.finditer(text, first.start()):
+            if text[end:part.start()].strip(" ,").lower() not in ("", "and"):
+                break
+            parts.append(_minutes(_to_number(part.group(1)), part.group(2)))
+            end = part.end()
+    if None in parts:
+        # No number, or a unit like days that isn't a plausible task estimate
+        return value
+
+    minutes = round(sum(parts))
+    return minutes if minutes > 0 else value
+
+
+def coerce_subtasks(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        text = value.strip()
+        return None if text.lower() in ("", "null", "none", "n/a", "[]") else [text]
+    if not isinstance(value, list):
+        return value
+
+    subtasks = []
+    for item in value:
+        if isinstance(item, dict):
+            item = item.get("title") or item.get("name") or item.get("text") or item.get("description")
+        if item is None or isinstance(item, (list, dict)):
+            continue
+        item = str(item).strip()
+        if item:
+            subtasks.append(item)
+    return subtasks or None
+
+
+def coerce_classification(data: Any) -> Any:
+    """
+    Leniently normalize a parsed classification before validation: field names,
+    enum casing ("high" -> "High"), estimates given as text or fractions, and
+    subtasks given as a string or as objects. Values that can't be coerced are
+    left as they are, for validate_classification to reject.
+    """
+    if not isinstance(data, dict):
+        return data
+
+    result = {}
+    for key, value in data.items():
+        result.setdefault(normalize_key(key), value)
+
+    if "priority" in result:
+        result["priority"] = _match_choice(result["priority"], PRIORITIES)
+    if "category" in result:
+        result["category"] = _match_choice(result["category"], CATEGORIES)
+    if result.get("estimated_time_minutes") is not None:
+        result["estimated_time_minutes"] = coerce_minutes(result["estimated_time_minutes"])
+    if "subtasks" in result:
+        result["subtasks"] = coerce_subtasks(result["subtasks"])
+    return result
@@ -0,0 +1,45 @@
+import ast
+import json
+from typing import Dict, List, Optional
+
+
+def normalize_subtasks(subtasks) -> Optional[List[Dict]]:
+    """
+    Convert subtasks into the stored form: a list of {"title": str, "done": bool}.
+
+    Accepts lists of strings or objects as returned by the AI provider, and the
+    JSON strings and Python list reprs stored by earlier versions. Returns None
+    when there are no subtasks.
+    """
+    if subtasks is None:
+        return None
+
+    if isinstance(subtasks, str):
+        text = subtasks.strip()
+        if not text:
+            return None
+        try:
+            subtasks = json.loads(text)
+        except ValueError:
+            try:
+                subtasks = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                # Plain text, keep it as a single subtask
+                subtasks = [text]
+
+    if not isinstance(subtasks, (list, tuple)):
+        subtasks = [subtasks]
+
+    items = []
+    for subtask in subtasks:
+        if isinstance(subtask, dict):
+            title = subtask.get("title") or subtask.get("name") or subtask.get("text")
+            done = bool(subtask.get("done", False))
+        else:
+            title = subtask
+            done = False
+        if title is None or not str(title).strip():
+            continue
+        items.append({"title": str(title).strip(), "done": done})
+
+    return items or None
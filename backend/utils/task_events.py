@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Optional, Set
+
+import asyncpg
+
+from config import settings
+from models.user_task_version import TASK_EVENTS_CHANNEL
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Sent to a subscriber that may have missed events and should reload its tasks
+RESYNC_EVENT = {"type": "resync"}
+
+
+class TaskEventBroker:
+    """
+    Fans task change events out to the event streams of this process.
+
+    One dedicated connection LISTENs on the task_events channel. Events are
+    published with pg_notify in the writing transaction, so every uvicorn worker
+    and process sees every committed change, whichever process made it.
+    """
+
+    def __init__(self, queue_size: int, reconnect_delay: float):
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.connected = False
+        self.notifications = 0
+        self.dropped = 0
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(), name="task-event-listener")
+
+    async def stop(self):
+        listener = self._listener
+        self._listener = None
+        if listener is not None:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def stats(self) -> Dict:
+        return {
+            "connected": self.connected,
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "users": len(self._subscribers),
+            "notifications": self.notifications,
+            "dropped": self.dropped
+        }
+
+    def _put(self, queue: asyncio.Queue, event: Dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: replace its backlog with a single resync
+            self.dropped += queue.qsize()
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC_EVENT)
+
+    def _broadcast_resync(self):
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._put(queue, RESYNC_EVENT)
+
+    def _on_notification(self, connection, pid, channel, payload: str):
+        self.notifications += 1
+        try:
+            notification = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed task event: {payload[:200]}")
+            return
+
+        queues = self._subscribers.get(notification["user_id"])
+        if not queues:
+            return
+        for event in notification["events"]:
+            event = {**event, "change_version": notification["change_version"]}
+            for queue in queues:
+                self._put(queue, event)
+
+    async def _listen(self):
+        reconnecting = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(
+                    user=settings.postgres_user,
+                    password=settings.postgres_password,
+                    host=settings.postgres_host,
+                    port=settings.postgres_port,
+                    database=settings.postgres_db
+                )
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(TASK_EVENTS_CHANNEL, self._on_notification)
+                self.connected = True
+                logger.info(f"Listening for task events on channel '{TASK_EVENTS_CHANNEL}'")
+                if reconnecting:
+                    # Notifications sent while disconnected are lost
+                    self._broadcast_resync()
+                await closed.wait()
+                logger.warning("Task event connection closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Task event listener failed: {str(e)}")
+            finally:
+                self.connected = False
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            reconnecting = True
+            await asyncio.sleep(self.reconnect_delay)
+
+
+task_event_broker = TaskEventBroker(
+    queue_size=settings.task_events_queue_size,
+    reconnect_delay=settings.task_events_reconnect_delay
+)
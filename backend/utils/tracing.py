@@ -0,0 +1,151 @@
+import logging
+from contextlib import contextmanager
+
+from config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Longest SQL text recorded on a span
+MAX_STATEMENT_LENGTH = 2000
+
+_tracer = None
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _build_exporter():
+    exporter = settings.tracing_exporter.lower()
+    if exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+    if exporter == "file":
+        # One JSON document per line
+        output = open(settings.tracing_file_path, "a", buffering=1)
+        return ConsoleSpanExporter(out=output, formatter=lambda span: span.to_json(indent=None) + "\n")
+    if exporter == "console":
+        return ConsoleSpanExporter()
+    raise ValueError(f"Unknown tracing exporter '{settings.tracing_exporter}', expected otlp, file or console")
+
+
+def setup_tracing(app) -> bool:
+    """
+    Trace incoming requests of the FastAPI app and export spans, if tracing is enabled.
+
+    OpenTelemetry is an optional dependency (requirements-tracing.txt); without it
+    tracing stays off and trace_span() is a no-op. Incoming W3C traceparent headers,
+    e.g. from the frontend proxy, make backend spans children of the caller's trace.
+    """
+    global _tracer
+    if not settings.tracing_enabled or _tracer is not None:
+        return _tracer is not None
+
+    try:
+        from opentelemetry import trace
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        logger.warning("Tracing is enabled but OpenTelemetry is not installed (pip install -r requirements-tracing.txt)")
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio))
+    )
+    provider.add_span_processor(BatchSpanProcessor(_build_exporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(__name__)
+
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=provider, excluded_urls="health,metrics")
+    logger.info(f"Tracing enabled, exporting spans to {settings.tracing_exporter}")
+    return True
+
+
+def shutdown_tracing():
+    """Flush buffered spans"""
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+@contextmanager
+def trace_span(name: str, **attributes):
+    """
+    Run the block in a child span of the current trace, or do nothing while tracing is off
+    """
+    if _tracer is None:
+        yield _NOOP_SPAN
+        return
+
+    with _tracer.start_as_current_span(name) as span:
+        for key, value in attributes.items():
+            if value is not None:
+                span.set_attribute(key, value)
+        yield span
+
+
+def _statement_name(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "SQL"
+
+
+def trace_engine(engine, name: str):
+    """
+    Record a span for every statement executed on a (sync) engine inside a trace.
+
+    Statements outside any trace, like the classification queue polls, are not
+    recorded so they don't flood the exporter with single-span traces.
+    Pass async_engine.sync_engine for an async engine.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _tracer is None:
+            return
+        from opentelemetry import trace
+        if not trace.get_current_span().get_span_context().is_valid:
+            return
+        span = _tracer.start_span(_statement_name(statement), attributes={
+            "db.system": "postgresql",
+            "db.engine": name,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH]
+        })
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            span = spans.pop()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute("db.rowcount", cursor.rowcount)
+            span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+        if spans:
+            from opentelemetry.trace import Status, StatusCode
+            span = spans.pop()
+            span.record_exception(context.original_exception)
+            span.set_status(Status(StatusCode.ERROR, str(context.original_exception)))
+            span.end()
+
@@ -1,7 +1,21 @@
+import os
+
+# Optional cooperative server: patch the standard library before anything else imports it
+FRONTEND_SERVER = os.environ.get('FRONTEND_SERVER', 'flask')
+if FRONTEND_SERVER == 'gevent':
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        FRONTEND_SERVER = 'flask'
+
+import copy
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+import threading
+import time
+from flask import Flask, Response, render_template, request, jsonify, redirect, stream_with_context, url_for
 import requests
-import os
+from requests.adapters import HTTPAdapter
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -12,6 +26,116 @@ app = Flask(__name__)
 # Get backend URL from environment variable or default to localhost
 BACKEND_URL = os.environ.get('BACKEND_URL', 'http://backend:8000')
 
+# Backend connection pool and timeouts
+BACKEND_POOL_SIZE = int(os.environ.get('BACKEND_POOL_SIZE', '20'))
+BACKEND_CONNECT_TIMEOUT = float(os.environ.get('BACKEND_CONNECT_TIMEOUT', '5'))
+BACKEND_READ_TIMEOUT = float(os.environ.get('BACKEND_READ_TIMEOUT', '120'))  # Task creation waits for AI classification
+
+# Seconds the backend AI configuration is cached; /api/update-config invalidates it immediately
+CONFIG_CACHE_TTL = float(os.environ.get('CONFIG_CACHE_TTL', '30'))
+
+class BackendSession(requests.Session):
+    """Session with keep-alive connections to the backend and default timeouts"""
+
+    def __init__(self):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', (BACKEND_CONNECT_TIMEOUT, BACKEND_READ_TIMEOUT))
+        return super().request(method, url, **kwargs)
+
+# Shared by all requests, so proxied calls reuse pooled connections
+backend = BackendSession()
+
+def setup_tracing():
+    """
+    Trace incoming requests and propagate the trace to the backend (W3C traceparent).
+
+    Enabled with TRACING_ENABLED=true; needs the packages in requirements-tracing.txt.
+    """
+    if os.environ.get('TRACING_ENABLED', 'false').lower() not in ('1', 'true', 'yes'):
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.instrumentation.flask import FlaskInstrumentor
+        from opentelemetry.instrumentation.requests import RequestsInstrumentor
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        logger.warning("TRACING_ENABLED is set but OpenTelemetry is not installed (pip install -r requirements-tracing.txt)")
+        return
+
+    exporter_name = os.environ.get('TRACING_EXPORTER', 'otlp').lower()
+    if exporter_name == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(endpoint=os.environ.get('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces'))
+    elif exporter_name == 'file':
+        output = open(os.environ.get('TRACING_FILE_PATH', 'traces.jsonl'), 'a', buffering=1)
+        exporter = ConsoleSpanExporter(out=output, formatter=lambda span: span.to_json(indent=None) + '\n')
+    else:
+        exporter = ConsoleSpanExporter()
+
+    provider = TracerProvider(
+        resource=Resource.create({'service.name': os.environ.get('TRACING_SERVICE_NAME', 'ai-task-helper-frontend')}),
+        sampler=ParentBased(TraceIdRatioBased(float(os.environ.get('TRACING_SAMPLE_RATIO', '1.0'))))
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    FlaskInstrumentor().instrument_app(app, tracer_provider=provider, excluded_urls='static')
+    # Outgoing backend calls get a client span and carry the trace context
+    RequestsInstrumentor().instrument(tracer_provider=provider)
+    logger.info(f"Tracing enabled, exporting spans to {exporter_name}")
+
+setup_tracing()
+
+class ConfigCache:
+    """Backend AI configuration cached for CONFIG_CACHE_TTL seconds"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._config = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._config is not None and time.monotonic() < self._expires_at:
+                return copy.deepcopy(self._config)
+
+        response = backend.get(f'{BACKEND_URL}/api/config')
+        response.raise_for_status()
+        config = response.json()
+        with self._lock:
+            self._config = config
+            self._expires_at = time.monotonic() + self.ttl
+        return copy.deepcopy(config)
+
+    def invalidate(self):
+        with self._lock:
+            self._config = None
+
+config_cache = ConfigCache(CONFIG_CACHE_TTL)
+
+# HTTP caching headers passed through between the browser and the backend
+CONDITIONAL_REQUEST_HEADERS = ('If-None-Match', 'If-Match')
+CACHE_RESPONSE_HEADERS = ('ETag', 'Cache-Control', 'X-Next-Cursor')
+
+def conditional_headers():
+    """Conditional request headers from the browser to forward to the backend"""
+    return {name: request.headers[name] for name in CONDITIONAL_REQUEST_HEADERS if name in request.headers}
+
+def proxy_response(response):
+    """Flask response for a backend response, keeping caching headers and bodiless 304s"""
+    headers = {name: response.headers[name] for name in CACHE_RESPONSE_HEADERS if name in response.headers}
+    if response.status_code == 304:
+        return '', 304, headers
+    return jsonify(response.json()), response.status_code, headers
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -24,9 +148,8 @@ def handle_tasks():
 
             data = request.json
 
-            # Get current configuration to use for AI processing
-            config_response = requests.get(f'{BACKEND_URL}/api/config')
-            config = config_response.json()
+            # Get current configuration to use for AI processing (cached, saves a backend round trip)
+            config = config_cache.get()
 
             logger.info(f"Current backend configuration: provider={config.get('provider_url')}, model={config.get('model')}")
 
@@ -38,7 +161,7 @@ def handle_tasks():
             }
 
             # Make the request to the backend with parameters
-            response = requests.post(f'{BACKEND_URL}/api/v1/tasks/', json=data, params=params)
+            response = backend.post(f'{BACKEND_URL}/api/v1/tasks/', json=data, params=params)
             logger.info(f"Backend response status: {response.status_code}")
 
             result = response.json()
@@ -55,15 +178,45 @@ def handle_tasks():
 @app.route('/api/users/<user_id>/tasks', methods=['GET'])
 def get_user_tasks(user_id):
     try:
-        response = requests.get(f'{BACKEND_URL}/api/v1/users/{user_id}/tasks')
+        # Forward pagination, filter and sort parameters as-is
+        response = backend.get(f'{BACKEND_URL}/api/v1/users/{user_id}/tasks', params=request.args, headers=conditional_headers())
+        return proxy_response(response)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/users/<user_id>/tasks/search', methods=['GET'])
+def search_user_tasks(user_id):
+    try:
+        response = backend.get(f'{BACKEND_URL}/api/v1/users/{user_id}/tasks/search', params=request.args)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/users/<user_id>/events', methods=['GET'])
+def stream_user_events(user_id):
+    """Relay the backend's Server-Sent Events stream of task changes"""
+    try:
+        response = backend.get(f'{BACKEND_URL}/api/v1/users/{user_id}/events', stream=True, timeout=(BACKEND_CONNECT_TIMEOUT, None))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if response.status_code != 200:
+        return proxy_response(response)
+
+    def relay():
+        try:
+            for chunk in response.iter_content(chunk_size=None):
+                yield chunk
+        finally:
+            response.close()
+
+    return Response(stream_with_context(relay()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/health', methods=['GET'])
 def api_health():
     try:
-        response = requests.get(f'{BACKEND_URL}/health')
+        # Provider health is cached by the backend; pass force=true to probe now
+        response = backend.get(f'{BACKEND_URL}/api/health', params=request.args)
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -77,7 +230,8 @@ def update_token():
             return jsonify({'status': 'error', 'message': 'Token is required'}), 400
 
         # Forward the request to the backend
-        response = requests.post(f'{BACKEND_URL}/api/update-token', json={'token': token})
+        response = backend.post(f'{BACKEND_URL}/api/update-token', json={'token': token})
+        config_cache.invalidate()
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -85,8 +239,9 @@ def update_token():
 @app.route('/api/config', methods=['GET'])
 def get_config():
     try:
-        response = requests.get(f'{BACKEND_URL}/api/config')
-        return jsonify(response.json()), response.status_code
+        return jsonify(config_cache.get()), 200
+    except requests.HTTPError as e:
+        return jsonify({'error': str(e)}), e.response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -101,11 +256,12 @@ def update_config():
                 return jsonify({'status': 'error', 'message': f'{field} is required'}), 400
 
         # Forward the request to the backend
-        response = requests.post(f'{BACKEND_URL}/api/update-config', json={
+        response = backend.post(f'{BACKEND_URL}/api/update-config', json={
             'provider_url': data['provider_url'],
             'api_token': data['api_token'],
             'model_name': data['model_name']
         })
+        config_cache.invalidate()
         return jsonify(response.json()), response.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -115,7 +271,7 @@ def handle_task(task_id):
     if request.method == 'DELETE':
         try:
             logger.info(f"Received request to delete task ID: {task_id}")
-            response = requests.delete(f'{BACKEND_URL}/api/v1/tasks/{task_id}')
+            response = backend.delete(f'{BACKEND_URL}/api/v1/tasks/{task_id}')
             logger.info(f"Task ID {task_id} deleted successfully")
             return jsonify(response.json()), response.status_code
         except Exception as e:
@@ -124,10 +280,12 @@ def handle_task(task_id):
     elif request.method == 'GET':
         try:
             logger.info(f"Received request to get task ID: {task_id}")
-            response = requests.get(f'{BACKEND_URL}/api/v1/tasks/{task_id}')
-            result = response.json()
-            logger.info(f"Retrieved task ID {task_id}: {result.get('title', 'Unknown title')}")
-            return jsonify(result), response.status_code
+            response = backend.get(f'{BACKEND_URL}/api/v1/tasks/{task_id}', headers=conditional_headers())
+            if response.status_code == 304:
+                logger.info(f"Task ID {task_id} not modified")
+            else:
+                logger.info(f"Retrieved task ID {task_id}: {response.json().get('title', 'Unknown title')}")
+            return proxy_response(response)
         except Exception as e:
             logger.error(f"Error getting task {task_id}: {str(e)}")
             return jsonify({'error': str(e)}), 500
@@ -136,18 +294,35 @@ def handle_task(task_id):
             logger.info(f"Received request to update task ID: {task_id}, data: {request.json}")
             data = request.json
             # Forward the request to the backend
-            response = requests.put(f'{BACKEND_URL}/api/v1/tasks/{task_id}', json=data)
-            result = response.json()
+            response = backend.put(f'{BACKEND_URL}/api/v1/tasks/{task_id}', json=data, headers=conditional_headers())
             logger.info(f"Task ID {task_id} updated successfully")
-            return jsonify(result), response.status_code
+            return proxy_response(response)
         except Exception as e:
             logger.error(f"Error updating task {task_id}: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/tasks/<int:task_id>/subtasks/<int:subtask_index>', methods=['PATCH'])
+def update_subtask(task_id, subtask_index):
+    try:
+        logger.info(f"Received request to update subtask {subtask_index} of task ID: {task_id}")
+        response = backend.patch(f'{BACKEND_URL}/api/v1/tasks/{task_id}/subtasks/{subtask_index}', json=request.json)
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        logger.error(f"Error updating subtask {subtask_index} of task {task_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/static/<path:path>')
 def send_static(path):
     from flask import send_from_directory
     return send_from_directory('static', path)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    if FRONTEND_SERVER == 'gevent':
+        # One greenlet per connection: long-lived event streams don't tie up threads
+        from gevent.pywsgi import WSGIServer
+        logger.info("Serving with gevent on port 5000")
+        WSGIServer(('0.0.0.0', 5000), app).serve_forever()
+    else:
+        if os.environ.get('FRONTEND_SERVER') == 'gevent':
+            logger.warning("FRONTEND_SERVER=gevent but gevent is not installed, using the Flask server")
+        app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
\ No newline at end of file
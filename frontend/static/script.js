@@ -5,6 +5,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const taskDescriptionInput = document.getElementById('taskDescription');
     const filterUserIdInput = document.getElementById('filterUserId');
     const loadTasksBtn = document.getElementById('loadTasksBtn');
+    const searchQueryInput = document.getElementById('searchQuery');
+    const searchTasksBtn = document.getElementById('searchTasksBtn');
     const tasksContainer = document.getElementById('tasksContainer');
     const configStatusDiv = document.getElementById('configStatus');
     const providerUrlInput = document.getElementById('providerUrl');
@@ -117,6 +119,51 @@ document.addEventListener('DOMContentLoaded', function() {
         await loadTasks(userId);
     });
 
+    // Search tasks button click
+    searchTasksBtn.addEventListener('click', async function() {
+        const userId = filterUserIdInput.value.trim();
+        const query = searchQueryInput.value.trim();
+        if (!userId) {
+            showError('Please enter a username to search tasks');
+            return;
+        }
+        if (!query) {
+            await loadTasks(userId);
+            return;
+        }
+
+        await searchTasks(userId, query);
+    });
+
+    // Search a user's tasks on the server
+    async function searchTasks(userId, query) {
+        try {
+            showLoading(true);
+            tasksContainer.innerHTML = '<div class="loading">Searching tasks...</div>';
+
+            const params = new URLSearchParams({ q: query });
+            const response = await fetch(`/api/users/${encodeURIComponent(userId)}/tasks/search?${params}`);
+
+            if (response.ok) {
+                const tasks = await response.json();
+                if (tasks.length === 0) {
+                    tasksContainer.innerHTML = `<div class="no-tasks">No tasks matching "${escapeHtml(query)}".</div>`;
+                    return;
+                }
+                displayTasks(tasks, userId);
+            } else {
+                const error = await response.json();
+                showError(`Failed to search tasks: ${error.detail || 'Unknown error'}`);
+                tasksContainer.innerHTML = '';
+            }
+        } catch (error) {
+            showError(`Error searching tasks: ${error.message}`);
+            tasksContainer.innerHTML = '';
+        } finally {
+            showLoading(false);
+        }
+    }
+
     // Load tasks for a specific user
     async function loadTasks(userId) {
         try {
@@ -128,6 +175,7 @@ document.addEventListener('DOMContentLoaded', function() {
             if (response.ok) {
                 const tasks = await response.json();
                 displayTasks(tasks, userId);
+                subscribeToTaskEvents(userId);
             } else {
                 const error = await response.json();
                 showError(`Failed to load tasks: ${error.detail || 'Unknown error'}`);
@@ -141,6 +189,48 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Live updates: the server pushes an event whenever one of the user's tasks changes
+    let taskEvents = null;
+    let taskEventsUserId = null;
+    let refreshTimer = null;
+
+    function subscribeToTaskEvents(userId) {
+        if (!window.EventSource || taskEventsUserId === userId) {
+            return;
+        }
+        if (taskEvents) {
+            taskEvents.close();
+        }
+
+        taskEventsUserId = userId;
+        taskEvents = new EventSource(`/api/users/${encodeURIComponent(userId)}/events`);
+        ['created', 'updated', 'classified', 'deleted', 'resync'].forEach(type => {
+            taskEvents.addEventListener(type, () => scheduleRefresh(userId));
+        });
+    }
+
+    // Coalesce bursts of events (e.g. bulk creation) into one refresh
+    function scheduleRefresh(userId) {
+        clearTimeout(refreshTimer);
+        refreshTimer = setTimeout(() => refreshTasks(userId), 300);
+    }
+
+    // Reload the task list in place, without the loading indicator
+    async function refreshTasks(userId) {
+        // Leave search results alone until the user searches again
+        if (searchQueryInput.value.trim() || document.querySelector('.modal')) {
+            return;
+        }
+        try {
+            const response = await fetch(`/api/users/${encodeURIComponent(userId)}/tasks`);
+            if (response.ok) {
+                displayTasks(await response.json(), userId);
+            }
+        } catch (error) {
+            // The next event triggers another refresh
+        }
+    }
+
     // Display tasks in the container
     function displayTasks(tasks, userId) {
         if (tasks.length === 0) {
@@ -156,6 +246,7 @@ document.addEventListener('DOMContentLoaded', function() {
             taskCard.innerHTML = `
                 <div class="task-title">${escapeHtml(task.title)}</div>
                 <div class="task-description">${escapeHtml(task.description || 'No description')}</div>
+                ${task.headline ? `<div class="task-headline">${highlightMarks(task.headline)}</div>` : ''}
                 <div class="task-meta">
                     <div class="meta-item priority-${task.priority.toLowerCase()}">
                         <span>Priority:</span>
@@ -178,7 +269,13 @@ document.addEventListener('DOMContentLoaded', function() {
                     <details>
                         <summary><strong>Subtasks:</strong></summary>
                         <ul class="subtasks-list">
-                            ${parseSubtasks(task.subtasks).map(st => `<li>${st}</li>`).join('')}
+                            ${parseSubtasks(task.subtasks).map((st, index) => `
+                            <li class="${st.done ? 'subtask-done' : ''}">
+                                <label>
+                                    <input type="checkbox" class="subtask-toggle" data-task-id="${task.id}" data-subtask-index="${index}" ${st.done ? 'checked' : ''}>
+                                    ${escapeHtml(st.title)}
+                                </label>
+                            </li>`).join('')}
                         </ul>
                     </details>
                 </div>
@@ -201,6 +298,19 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         });
 
+        // Add event listeners to subtask checkboxes
+        document.querySelectorAll('.subtask-toggle').forEach(checkbox => {
+            checkbox.addEventListener('change', async function() {
+                const taskId = parseInt(this.getAttribute('data-task-id'));
+                const subtaskIndex = parseInt(this.getAttribute('data-subtask-index'));
+                if (await toggleSubtask(taskId, subtaskIndex, this.checked)) {
+                    this.closest('li').classList.toggle('subtask-done', this.checked);
+                } else {
+                    this.checked = !this.checked;
+                }
+            });
+        });
+
         // Add event listeners to edit buttons
         document.querySelectorAll('.edit-btn').forEach(button => {
             button.addEventListener('click', function() {
@@ -328,6 +438,13 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Utility functions
+    // Escape a search snippet but keep the <mark> tags around matched words
+    function highlightMarks(text) {
+        return escapeHtml(text)
+            .replace(/&lt;mark&gt;/g, '<mark>')
+            .replace(/&lt;\/mark&gt;/g, '</mark>');
+    }
+
     function escapeHtml(text) {
         const div = document.createElement('div');
         div.textContent = text;
@@ -381,63 +498,98 @@ document.addEventListener('DOMContentLoaded', function() {
         document.querySelectorAll('.error, .success').forEach(el => el.remove());
     }
 
-    // Function to parse subtasks that can handle both JSON strings and Python list representations
+    // Function to parse subtasks into {title, done} objects.
+    // Handles the JSON arrays returned by the API as well as JSON strings and Python list representations
     function parseSubtasks(subtasks) {
         if (!subtasks) {
             return [];
         }
 
+        let items = subtasks;
+        if (typeof subtasks === 'string') {
+            items = parseSubtasksString(subtasks);
+        }
+        if (!Array.isArray(items)) {
+            return [];
+        }
+
+        return items
+            .map(item => (item !== null && typeof item === 'object')
+                ? { title: String(item.title || ''), done: Boolean(item.done) }
+                : { title: String(item), done: false })
+            .filter(item => item.title.length > 0);
+    }
+
+    function parseSubtasksString(subtasks) {
         try {
             // First, try to parse as JSON
             return JSON.parse(subtasks);
         } catch (e) {
             // If JSON parsing fails, try to handle as Python list representation
-            // Remove brackets and split by commas outside of quotes
-            if (typeof subtasks === 'string') {
-                // Handle Python-style list representation: "['item1', 'item2', 'item3']"
-                const trimmed = subtasks.trim();
-                if (trimmed.startsWith('[') && trimmed.endsWith(']')) {
-                    // Extract content between brackets
-                    const content = trimmed.substring(1, trimmed.length - 1);
-
-                    // Split by comma, but be careful with nested quotes
-                    const items = [];
-                    let currentItem = '';
-                    let insideQuotes = false;
-                    let quoteChar = null;
-
-                    for (let i = 0; i < content.length; i++) {
-                        const char = content[i];
-
-                        if ((char === '"' || char === "'") && (i === 0 || content[i-1] !== '\\')) {
-                            if (!insideQuotes) {
-                                insideQuotes = true;
-                                quoteChar = char;
-                            } else if (char === quoteChar) {
-                                insideQuotes = false;
-                                quoteChar = null;
-                            }
-                            currentItem += char;
-                        } else if (char === ',' && !insideQuotes) {
-                            items.push(currentItem.trim().replace(/^['"]|['"]$/g, ''));
-                            currentItem = '';
-                        } else {
-                            currentItem += char;
+            // Handle Python-style list representation: "['item1', 'item2', 'item3']"
+            const trimmed = subtasks.trim();
+            if (trimmed.startsWith('[') && trimmed.endsWith(']')) {
+                // Extract content between brackets
+                const content = trimmed.substring(1, trimmed.length - 1);
+
+                // Split by comma, but be careful with nested quotes
+                const items = [];
+                let currentItem = '';
+                let insideQuotes = false;
+                let quoteChar = null;
+
+                for (let i = 0; i < content.length; i++) {
+                    const char = content[i];
+
+                    if ((char === '"' || char === "'") && (i === 0 || content[i-1] !== '\\')) {
+                        if (!insideQuotes) {
+                            insideQuotes = true;
+                            quoteChar = char;
+                        } else if (char === quoteChar) {
+                            insideQuotes = false;
+                            quoteChar = null;
                         }
-                    }
-
-                    if (currentItem.trim()) {
+                        currentItem += char;
+                    } else if (char === ',' && !insideQuotes) {
                         items.push(currentItem.trim().replace(/^['"]|['"]$/g, ''));
+                        currentItem = '';
+                    } else {
+                        currentItem += char;
                     }
+                }
 
-                    return items.filter(item => item.length > 0);
+                if (currentItem.trim()) {
+                    items.push(currentItem.trim().replace(/^['"]|['"]$/g, ''));
                 }
+
+                return items.filter(item => item.length > 0);
             }
             // If all parsing fails, return empty array
             return [];
         }
     }
 
+    // Mark a subtask as done or open
+    async function toggleSubtask(taskId, subtaskIndex, done) {
+        try {
+            const response = await fetch(`/api/tasks/${taskId}/subtasks/${subtaskIndex}`, {
+                method: 'PATCH',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ done: done })
+            });
+            const result = await response.json();
+            if (!response.ok) {
+                throw new Error(result.detail || 'Failed to update subtask');
+            }
+            return true;
+        } catch (error) {
+            showError(`Error updating subtask: ${error.message}`);
+            return false;
+        }
+    }
+
     // The old token/model functions have been replaced with the new config functions
     // All functionality is now handled through the config section
 
@@ -535,7 +687,8 @@ document.addEventListener('DOMContentLoaded', function() {
             const params = new URLSearchParams({
                 provider_url: providerUrl,
                 api_token: apiToken,
-                model_name: modelName
+                model_name: modelName,
+                force: 'true'
             });
 
             const response = await fetch(`/api/health?${params}`);